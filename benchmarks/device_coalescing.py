@@ -0,0 +1,59 @@
+"""Stress the coalescing of device state changes with a flaky USB connector.
+
+Transitions between a missing and a locked device are fired at a given rate,
+the number of state_changed emissions that reach the wizard is reported,
+along with the counters of suppressed transitions.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.device_coalescing [RATE] [SECONDS] [WINDOW_IN_MS]
+"""
+import sys
+import time
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from device import Device
+
+# The rate is reached by firing a batch of transitions on every timer tick.
+TICK_IN_MS = 10
+
+
+def main(rate: int = 10000, seconds: int = 2, window: int = 50) -> None:
+    app = QApplication(sys.argv)
+
+    device = Device()
+    device.set_coalescing_window(window)
+    emitted = []
+    device.state_changed.connect(emitted.append)
+
+    commands = [Device.EmitFoundLocked, Device.EmitNotFound]
+    fired = 0
+
+    def fire() -> None:
+        nonlocal fired
+        for _ in range(rate * TICK_IN_MS // 1000):
+            device.check(commands[fired % 2])
+            fired += 1
+
+    timer = QTimer()
+    timer.timeout.connect(fire)
+    timer.start(TICK_IN_MS)
+    QTimer.singleShot(seconds * 1000, timer.stop)
+    # Let the last window expire.
+    QTimer.singleShot(seconds * 1000 + 2 * window + 100, app.quit)
+
+    start = time.perf_counter()
+    app.exec()
+    elapsed = time.perf_counter() - start
+
+    print(f"{fired} transitions fired in {elapsed:.2f}s ({fired / seconds:.0f}/s requested {rate}/s)")
+    print(f"{len(emitted)} state_changed emitted, final state: {device.state}")
+    print(f"suppressed: {device.suppressed_transitions}")
+    expected = Device.RemovedState if fired % 2 == 0 else Device.LockedState
+    if device.state != expected:
+        print(f"UNEXPECTED final state, expected {expected}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
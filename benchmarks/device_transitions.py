@@ -0,0 +1,55 @@
+"""Measure the throughput of device state transitions, without any GUI.
+
+Both the state chart on its own, and the Device, which goes through
+Qt signals, are measured.
+
+    python -m benchmarks.device_transitions [TRANSITIONS]
+"""
+import sys
+import time
+
+from device import Device
+from device.main import _State
+
+
+def state_throughput(count: int) -> float:
+    """How many events per second the state chart handles on its own."""
+    entered = [0]
+
+    def on_entered(state: int) -> None:
+        entered[0] += 1
+
+    state = _State(on_entered)
+    # A cycle that goes through all the states, and one rejected event.
+    events = [_State.not_found, _State.found_locked, _State.unlocking_started, _State.unlocking_failed,
+              _State.unlocking_started, _State.unlocking_succeeded, _State.locked, _State.found_locked]
+    cycles = count // len(events)
+    fire = state.fire
+    start = time.perf_counter()
+    for _ in range(cycles):
+        for event in events:
+            fire(event)
+    elapsed = time.perf_counter() - start
+    return cycles * len(events) / elapsed
+
+
+def device_throughput(count: int) -> float:
+    """How many transitions per second the Device handles, signals included."""
+    device = Device()
+    commands = [Device.EmitNotFound, Device.EmitFoundLocked, Device.EmitUnlockingSucceeded, Device.EmitLocked]
+    cycles = count // len(commands)
+    start = time.perf_counter()
+    for _ in range(cycles):
+        for command in commands:
+            device.check(command)
+    elapsed = time.perf_counter() - start
+    return cycles * len(commands) / elapsed
+
+
+def main(count: int = 1000000) -> None:
+    print(f"_State: {state_throughput(count):,.0f} events/s")
+    print(f"Device: {device_throughput(count // 10):,.0f} transitions/s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""Compare export throughput with 1, 2, 4 and 8 workers.
+
+The target is a tmpfs (/dev/shm) when available, so that the benchmark
+measures the per-file overhead of the engine rather than the disk.
+
+    python -m benchmarks.export_workers [FILE_COUNT] [FILE_SIZE_IN_BYTES]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from export.engine import Engine
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def tmpfs() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def create_files(directory: str, count: int, size: int) -> None:
+    payload = os.urandom(size)
+    for index in range(count):
+        with open(os.path.join(directory, f"file-{index:06d}"), "wb") as file:
+            file.write(payload)
+
+
+def main(count: int = 10000, size: int = 16 * 1024) -> None:
+    source = tempfile.mkdtemp(prefix="wizard-bench-source-", dir=tmpfs())
+    try:
+        create_files(source, count, size)
+        print(f"{count} files of {size} bytes")
+        for workers in WORKER_COUNTS:
+            destination = tempfile.mkdtemp(prefix="wizard-bench-target-", dir=tmpfs())
+            outcome = []
+            engine = Engine(workers=workers)
+            engine.succeeded.connect(lambda run_id: outcome.append("succeeded"))
+            engine.failed.connect(lambda run_id, reason: outcome.append(reason))
+            try:
+                start = time.perf_counter()
+                engine.run(0, [source], destination)
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(destination)
+            print(f"{workers} worker(s): {elapsed:.3f}s, {count / elapsed:.0f} files/s, {outcome[0]}")
+    finally:
+        shutil.rmtree(source)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
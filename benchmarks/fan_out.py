@@ -0,0 +1,54 @@
+"""Compare exporting to several destinations one after the other, and at once.
+
+One after the other, the sources are read once per destination. At once
+(see Engine.fan_out), they are read once in total. Everything is on
+a tmpfs (/dev/shm) when available, actual USB devices are much slower
+to write to, which the concurrent writes of a fan-out export hide.
+
+    python -m benchmarks.fan_out [DESTINATION_COUNT] [FILE_COUNT] [FILE_SIZE_IN_BYTES]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from export.engine import Engine
+
+from .export_workers import create_files, tmpfs
+
+
+def main(destinations: int = 4, count: int = 100, size: int = 4 * 1024 * 1024) -> None:
+    source = tempfile.mkdtemp(prefix="wizard-bench-source-", dir=tmpfs())
+    targets = []
+    try:
+        create_files(source, count, size)
+        print(f"{count} files of {size} bytes, to {destinations} destinations")
+
+        engine = Engine()
+        outcome = []
+        engine.succeeded.connect(lambda run_id: outcome.append("succeeded"))
+        engine.failed.connect(lambda run_id, reason: outcome.append(reason))
+
+        targets = [tempfile.mkdtemp(prefix="wizard-bench-target-", dir=tmpfs()) for _ in range(destinations)]
+        start = time.perf_counter()
+        for target in targets:
+            engine.run(0, [source], target)
+        elapsed = time.perf_counter() - start
+        print(f"One after the other: {elapsed:.3f}s, {outcome}")
+
+        for target in targets:
+            shutil.rmtree(target)
+        targets = [tempfile.mkdtemp(prefix="wizard-bench-target-", dir=tmpfs()) for _ in range(destinations)]
+        outcome.clear()
+        start = time.perf_counter()
+        engine.fan_out(0, [source], targets)
+        elapsed = time.perf_counter() - start
+        print(f"At once: {elapsed:.3f}s, {outcome}")
+    finally:
+        shutil.rmtree(source)
+        for target in targets:
+            shutil.rmtree(target)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""Check that the core runs without a GUI stack, and compare its memory footprint.
+
+The core (see core.Core) runs a small export with a QCoreApplication only,
+then the same export runs with the wizard on top. Each runs in a fresh
+interpreter, which reports its peak memory usage and the Qt modules it loaded.
+
+    python -m benchmarks.headless
+"""
+import json
+import os
+import subprocess
+import sys
+
+_EXPORT = """
+import json, os, resource, sys, tempfile
+{application}
+from core import Core
+from device import Device
+source = tempfile.mkdtemp()
+for index in range(10):
+    with open(os.path.join(source, str(index)), "wb") as file:
+        file.write(os.urandom(64 * 1024))
+core = Core([source])
+{view}
+core.device.set_mount_point(tempfile.mkdtemp())
+core.device.check(Device.EmitFoundUnlocked)
+core.export_service.finished.connect(app.quit)
+core.export_service.start()
+app.exec()
+print(json.dumps({{
+    "failure": core.export_service.failure,
+    "modules": sorted(name for name in sys.modules if name.startswith("PyQt5.Qt")),
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+CORE = _EXPORT.format(application="from PyQt5.QtCore import QCoreApplication; app = QCoreApplication(sys.argv)", view="")
+WIZARD = _EXPORT.format(
+    application="from PyQt5.QtWidgets import QApplication; app = QApplication(sys.argv)",
+    view="from wizard import Wizard; wizard = Wizard(core.device, core.export_service); wizard.show()",
+)
+
+
+def _run(script: str) -> dict:
+    environment = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=environment, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    core = _run(CORE)
+    wizard = _run(WIZARD)
+    for name, result in [("Core", core), ("Wizard", wizard)]:
+        print(f"{name}: {result['max_rss_kib'] / 1024:.1f} MiB peak, {', '.join(result['modules'])}, failure: {result['failure']}")
+    gui_modules = [module for module in core["modules"] if module != "PyQt5.QtCore"]
+    if gui_modules or core["failure"] is not None:
+        sys.exit(f"The core isn't headless: {gui_modules}, failure: {core['failure']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure how long it takes to construct (and show) many buttons.
+
+For comparison, the same number of buttons is also constructed with
+a stylesheet set on each of them, as PushButton used to do.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.push_buttons [BUTTON_COUNT]
+"""
+import sys
+import time
+
+from PyQt5.QtWidgets import *
+
+from buttons import PushButton
+from buttons.push_button import STYLESHEET
+
+
+def construction_time(count: int, button_factory) -> float:
+    """How long it takes to construct and show a window with that many buttons."""
+    window = QWidget()
+    layout = QGridLayout(window)
+    start = time.perf_counter()
+    for index in range(count):
+        layout.addWidget(button_factory(), index // 25, index % 25)
+    window.show()
+    QApplication.processEvents()
+    elapsed = time.perf_counter() - start
+    window.close()
+    window.deleteLater()
+    QApplication.processEvents()
+    return elapsed
+
+
+def main(count: int = 1000) -> None:
+    app = QApplication(sys.argv)
+
+    with open(STYLESHEET) as file:
+        stylesheet = file.read()
+
+    def per_widget_stylesheet() -> QPushButton:
+        button = QPushButton("BUTTON")
+        button.setProperty("class", f"button {PushButton.TypeContained}")
+        button.setStyleSheet(stylesheet)
+        return button
+
+    def push_button() -> PushButton:
+        button = PushButton(PushButton.TypeContained)
+        button.setText("BUTTON")
+        return button
+
+    print(f"{count} buttons with a stylesheet each: {construction_time(count, per_widget_stylesheet):.3f}s")
+    print(f"{count} PushButton: {construction_time(count, push_button):.3f}s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,68 @@
+"""Measure how long the wizard takes to show its first frame.
+
+A fresh interpreter imports the wizard (with -X importtime), constructs it,
+and renders it offscreen. The time to first frame includes the interpreter
+startup, the slowest imports are listed to see where the time goes.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.startup [RUNS]
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+# The time to first frame should stay below that, in seconds.
+FIRST_FRAME_TARGET = 0.3
+# How many of the slowest imports are listed.
+SLOWEST_IMPORTS = 15
+
+_CHILD = """
+import sys
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from device import Device
+from wizard import Wizard
+import export
+device = Device()
+wizard = Wizard(device, export.Service(device))
+wizard.show()
+app.processEvents()
+wizard.grab()
+print("frame", flush=True)
+"""
+
+
+def _run() -> Tuple[float, List[Tuple[float, str]]]:
+    environment = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    start = time.perf_counter()
+    child = subprocess.Popen([sys.executable, "-X", "importtime", "-c", _CHILD], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=environment)
+    child.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, errors = child.communicate()
+    if child.returncode != 0:
+        raise RuntimeError(errors)
+
+    imports = []
+    for line in errors.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative) / 1000000, name.strip()))
+    return elapsed, imports
+
+
+def main(runs: int = 5) -> None:
+    results = [_run() for _ in range(runs)]
+    elapsed, imports = min(results, key=lambda result: result[0])
+
+    print(f"Time to first frame: {elapsed * 1000:.0f} ms (best of {runs}), target: {FIRST_FRAME_TARGET * 1000:.0f} ms")
+    print("Slowest imports (cumulative):")
+    for seconds, name in sorted(imports, reverse=True)[:SLOWEST_IMPORTS]:
+        print(f"  {seconds * 1000:6.1f} ms  {name}")
+    if elapsed > FIRST_FRAME_TARGET:
+        sys.exit("The time to first frame is over target.")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,260 @@
+"""Run all the headless benchmarks, save the results as JSON, compare runs.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.suite [--output FILE] [--compare BASELINE] [--quick]
+
+Each result has a value, a unit, and whether lower values are better.
+When a baseline is given, results that got worse by more than
+REGRESSION_THRESHOLD are reported, and the exit status is 1.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from buttons import PushButton
+from device import Device
+from wizard import Wizard
+import export
+
+from .device_transitions import device_throughput
+from .export_workers import create_files, tmpfs
+from .push_buttons import construction_time
+
+# A result that got worse by more than that (relatively) is a regression.
+REGRESSION_THRESHOLD = 0.1
+# How long to wait for an export before giving up, in milliseconds.
+EXPORT_TIMEOUT = 60000
+
+# The sizes of the workloads, and their quick variants, e.g. for CI.
+WORKLOADS = {
+    "runs": (5, 2),
+    "walkthrough_files": (20, 5),
+    "device_transitions": (200000, 20000),
+    "export_files": (200, 50),
+    "export_file_size": (256 * 1024, 64 * 1024),
+    "buttons": (500, 100),
+    "repaints": (50, 10),
+}
+
+
+def _result(value: float, unit: str, lower_is_better: bool) -> Dict:
+    return {"value": round(value, 3), "unit": unit, "lower_is_better": lower_is_better}
+
+
+def _wait(signals: List[pyqtBoundSignal], timeout: int = EXPORT_TIMEOUT) -> None:
+    """Process events until one of the signals is emitted."""
+    loop = QEventLoop()
+    for signal in signals:
+        signal.connect(loop.quit)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+    for signal in signals:
+        signal.disconnect(loop.quit)
+
+
+def _service(device: Device) -> export.Service:
+    service = export.Service(device)
+    # There is one service per measurement, its threads are stopped as soon as it's done.
+    QApplication.instance().aboutToQuit.disconnect(service._stop_threads)
+    return service
+
+
+def walkthrough(workload: Dict) -> Dict:
+    """Walk through the wizard, from the start page until the export succeeded."""
+    source = tempfile.mkdtemp(prefix="wizard-bench-source-", dir=tmpfs())
+    create_files(source, workload["walkthrough_files"], 64 * 1024)
+    totals = []
+    steps = {}
+    try:
+        for _ in range(workload["runs"]):
+            destination = tempfile.mkdtemp(prefix="wizard-bench-target-", dir=tmpfs())
+            device = Device()
+            service = _service(device)
+            service.set_files([source])
+            device.set_mount_point(destination)
+            wizard = Wizard(device, service)
+
+            def step(name: str, action: Callable[[], None]) -> None:
+                start = time.perf_counter()
+                action()
+                QApplication.processEvents()
+                steps.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            step("start", wizard.show)
+            step("insert_device", lambda: (device.check(Device.EmitFoundLocked), wizard.next()))
+            step("unlock_device", wizard.next)
+            step("unlocked", lambda: (device.attempt_unlocking("passphrase"), device.check(Device.EmitUnlockingSucceeded)))
+            step("review_data", wizard.next)
+            step("export", lambda: (wizard.next(), _wait([service.succeeded, service.failed])))
+            totals.append((time.perf_counter() - start) * 1000)
+            if wizard.currentId() != Wizard.PageId.EXPORT or service.failure is not None:
+                raise RuntimeError(f"The walkthrough didn't complete: {service.failure}")
+
+            wizard.close()
+            service._stop_threads()
+            shutil.rmtree(destination)
+    finally:
+        shutil.rmtree(source)
+
+    results = {"wizard_walkthrough": _result(statistics.median(totals), "ms", True)}
+    for name, durations in steps.items():
+        results[f"wizard_step_{name}"] = _result(statistics.median(durations), "ms", True)
+    return results
+
+
+def device_transitions(workload: Dict) -> Dict:
+    """Device transitions, signals included."""
+    count = workload["device_transitions"]
+    throughput = max(device_throughput(count) for _ in range(workload["runs"]))
+    return {"device_transitions": _result(throughput, "transitions/s", False)}
+
+
+def export_throughput(workload: Dict) -> Dict:
+    """Export through the service, from tmpfs to tmpfs."""
+    count = workload["export_files"]
+    size = workload["export_file_size"]
+    source = tempfile.mkdtemp(prefix="wizard-bench-source-", dir=tmpfs())
+    create_files(source, count, size)
+    durations = []
+    try:
+        for _ in range(workload["runs"]):
+            destination = tempfile.mkdtemp(prefix="wizard-bench-target-", dir=tmpfs())
+            device = Device()
+            service = _service(device)
+            service.set_files([source])
+            device.set_mount_point(destination)
+            device.check(Device.EmitFoundUnlocked)
+
+            start = time.perf_counter()
+            service.start()
+            _wait([service.succeeded, service.failed])
+            durations.append(time.perf_counter() - start)
+            failure = service.failure
+            exported = sum(len(files) for _, _, files in os.walk(destination))
+            service._stop_threads()
+            shutil.rmtree(destination)
+            if failure is not None or exported != count:
+                raise RuntimeError(f"The export failed: {failure}")
+    finally:
+        shutil.rmtree(source)
+
+    elapsed = min(durations)
+    return {
+        "export_throughput": _result(count * size / elapsed / 1024 / 1024, "MiB/s", False),
+        "export_files_per_second": _result(count / elapsed, "files/s", False),
+    }
+
+
+def push_buttons(workload: Dict) -> Dict:
+    """Construct buttons, then repaint them."""
+    count = workload["buttons"]
+
+    def push_button() -> PushButton:
+        button = PushButton(PushButton.TypeContained)
+        button.setText("BUTTON")
+        return button
+
+    construction = min(construction_time(count, push_button) for _ in range(workload["runs"]))
+
+    window = QWidget()
+    layout = QGridLayout(window)
+    buttons = [push_button() for _ in range(count)]
+    for index, button in enumerate(buttons):
+        layout.addWidget(button, index // 25, index % 25)
+    window.show()
+    QApplication.processEvents()
+    repaints = workload["repaints"]
+    start = time.perf_counter()
+    for index in range(repaints):
+        # Alternate elevations, as hovering and pressing would.
+        for button in buttons:
+            button.setElevation(PushButton.ElevationHigh if index % 2 else PushButton.ElevationLow)
+        window.repaint()
+    repaint = (time.perf_counter() - start) / repaints
+    window.close()
+    window.deleteLater()
+    QApplication.processEvents()
+
+    return {
+        "push_button_construction": _result(construction / count * 1000000, "us/button", True),
+        "push_button_repaint": _result(repaint / count * 1000000, "us/button", True),
+    }
+
+
+BENCHMARKS = [walkthrough, device_transitions, export_throughput, push_buttons]
+
+
+def run(quick: bool = False) -> Dict:
+    workload = {name: sizes[1 if quick else 0] for name, sizes in WORKLOADS.items()}
+    results = {}
+    for benchmark in BENCHMARKS:
+        print(f"{benchmark.__name__}...", file=sys.stderr, flush=True)
+        results.update(benchmark(workload))
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": QApplication.platformName(),
+            "cpus": os.cpu_count(),
+        },
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict) -> List[str]:
+    """Print how the results changed, return the names of those that regressed."""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None or not previous["value"]:
+            continue
+        change = (result["value"] - previous["value"]) / previous["value"]
+        worse = change > REGRESSION_THRESHOLD if result["lower_is_better"] else change < -REGRESSION_THRESHOLD
+        if worse:
+            regressions.append(name)
+        print(f"{name:32} {previous['value']:>14,.3f} -> {result['value']:>14,.3f} {result['unit']:14} {change:+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the headless benchmarks.")
+    parser.add_argument("--output", help="where to save the results (JSON)")
+    parser.add_argument("--compare", help="results of a previous run (JSON) to compare with")
+    parser.add_argument("--quick", action="store_true", help="use smaller workloads")
+    arguments = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])
+    report = run(arguments.quick)
+
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline:
+            regressions = compare(json.load(baseline), report)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+    else:
+        for name, result in report["results"].items():
+            print(f"{name:32} {result['value']:>14,.3f} {result['unit']}")
+
+
+if __name__ == "__main__":
+    main()
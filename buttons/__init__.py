@@ -1 +1,2 @@
 from .push_button import PushButton
+from .stylesheets import StyleSheetRegistry, registry as stylesheets
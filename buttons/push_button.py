@@ -5,116 +5,14 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
-from .state_transitions import SpecificKeyEventTransition, SpecificMouseButtonEventTransition
+from . import shadows
+from . import state_tracker
+from .stylesheets import registry as stylesheets
 
-
-class PushButtonState(QWidget):
-    """The state of a button for styling purposes.
-
-    There should be no need for you to use this class directly.
-
-    This class described the behavior of a button. A disabled button doesn't
-    react to user interaction. An enabled button can be in a resting state,
-    be subject to hover, focus, or be pressed.
-
-    These states follow the Material Design 2 guidelines.
-    See https://material.io/components/buttons.html
-
-
-    Paste the following state chart in https://mermaid.live for
-    a visual representation of the behavior implemented by this class!
-
-    stateDiagram-v2
-      [*] --> enabled
-      enabled --> disabled: EnabledChange
-      disabled --> enabled: EnabledChange
-
-      state enabled {
-        [*] --> resting
-        resting --> hoverFromResting: HoverEnter
-        hoverFromResting --> resting: HoverLeave
-
-        hoverFromResting --> pressedFromHoverFromResting: MouseButtonPress
-        pressedFromHoverFromResting --> hoverFromFocusFromResting: MouseButtonRelease
-
-        resting --> focusFromResting: FocusIn
-        focusFromResting --> resting: FocusOut
-
-        focusFromResting --> pressedFromFocusFromResting: KeyPress
-        pressedFromFocusFromResting --> focusFromResting: KeyRelease
-
-        focusFromResting --> hoverFromFocusFromResting: HoverEnter
-        hoverFromFocusFromResting --> focusFromResting: HoverLeave
-
-        hoverFromFocusFromResting --> hoverFromResting: FocusOut
-
-        hoverFromFocusFromResting --> pressedFromHoverFromFocusFromResting: MouseButtonPress
-        pressedFromHoverFromFocusFromResting --> hoverFromFocusFromResting: MouseButtonRelease
-
-        hoverFromFocusFromResting --> pressedFromHoverFromFocusFromResting: KeyPress
-        pressedFromHoverFromFocusFromResting --> hoverFromFocusFromResting: KeyRelease
-      }
-    """
-
-    def __init__(self, button: "PushButton") -> None:
-        super().__init__()
-
-        self._button = button
-
-        # Declare the state chart described in the docstring.
-        # See https://doc.qt.io/qt-5/statemachine-api.html
-        #
-        # This is a very declarative exercise.
-        # The state names are part of the API of this class.
-        self._machine = QStateMachine()
-
-        self.enabled = QState()
-        self.disabled = QState()
-        QEventTransition(self._button, QEvent.EnabledChange, self.enabled).setTargetState(self.disabled)
-        QEventTransition(self._button, QEvent.EnabledChange, self.disabled).setTargetState(self.enabled)
-
-        self._machine.addState(self.enabled)
-        self._machine.addState(self.disabled)
-        self._machine.setInitialState(self.enabled)
-
-        self.resting = QState(self.enabled)
-        self.enabled.setInitialState(self.resting)
-
-        self.hoverFromResting = QState(self.enabled)
-        self.pressedFromHoverFromResting = QState(self.enabled)
-        self.focusFromResting = QState(self.enabled)
-        self.pressedFromFocusFromResting = QState(self.enabled)
-        self.hoverFromFocusFromResting = QState(self.enabled)
-        self.pressedFromHoverFromFocusFromResting = QState(self.enabled)
-
-        QEventTransition(self._button, QEvent.HoverEnter, self.resting).setTargetState(self.hoverFromResting)
-        QEventTransition(self._button, QEvent.HoverLeave, self.hoverFromResting).setTargetState(self.resting)
-
-        SpecificMouseButtonEventTransition(self._button, QEvent.MouseButtonPress, Qt.LeftButton, self.hoverFromResting).setTargetState(self.pressedFromHoverFromResting)
-        QEventTransition(self._button, QEvent.MouseButtonRelease, self.pressedFromHoverFromResting).setTargetState(self.hoverFromFocusFromResting)
-
-        QEventTransition(self._button, QEvent.FocusIn, self.resting).setTargetState(self.focusFromResting)
-        QEventTransition(self._button, QEvent.FocusOut, self.focusFromResting).setTargetState(self.resting)
-
-        SpecificKeyEventTransition(self._button, QEvent.KeyPress, Qt.Key_Space, self.focusFromResting).setTargetState(self.pressedFromFocusFromResting)
-        SpecificKeyEventTransition(self._button, QEvent.KeyRelease, Qt.Key_Space, self.pressedFromFocusFromResting).setTargetState(self.focusFromResting)
-
-        QEventTransition(self._button, QEvent.HoverEnter, self.focusFromResting).setTargetState(self.hoverFromFocusFromResting)
-        QEventTransition(self._button, QEvent.HoverLeave, self.hoverFromFocusFromResting).setTargetState(self.focusFromResting)
-
-        QEventTransition(self._button, QEvent.FocusOut, self.hoverFromFocusFromResting).setTargetState(self.hoverFromResting)
-
-        SpecificMouseButtonEventTransition(self._button, QEvent.MouseButtonPress, Qt.LeftButton, self.hoverFromFocusFromResting).setTargetState(self.pressedFromHoverFromFocusFromResting)
-        QEventTransition(self._button, QEvent.MouseButtonRelease, self.pressedFromHoverFromFocusFromResting).setTargetState(self.hoverFromFocusFromResting)
-
-        SpecificKeyEventTransition(self._button, QEvent.KeyPress, Qt.Key_Space,  self.hoverFromFocusFromResting).setTargetState(self.pressedFromHoverFromFocusFromResting)
-        SpecificKeyEventTransition(self._button, QEvent.KeyRelease, Qt.Key_Space, self.pressedFromHoverFromFocusFromResting).setTargetState(self.hoverFromFocusFromResting)
-
-    def start(self, initially_enabled: bool = True) -> None:
-        self._machine.setInitialState(self.enabled)
-        if not initially_enabled:
-            self._machine.setInitialState(self.disabled)
-        self._machine.start()
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "push_button.css")
+# The space around the button, where its shadow can be painted.
+# Must match the margin in push_button.css
+MARGINS = QMargins(4, 16, 4, 16)
 
 
 class PushButton(QPushButton):
@@ -149,6 +47,18 @@ class PushButton(QPushButton):
     StatePressed = State("pressed")
     StateDisabled = State("disabled")
 
+    # The styles for each state of the tracker, in the order of state_tracker.STATES.
+    _styles = (
+        StateDisabled,
+        StateEnabled,
+        StateHover,
+        StatePressed,
+        StateFocus,
+        StatePressed,
+        StateHover,
+        StatePressed,
+    )
+
     # You shouldn't need to refer to these elevations outside this class.
     # See Material Design 2 diagram of default elevation values.
     # https://material.io/design/environment/elevation.html#default-elevations
@@ -161,54 +71,24 @@ class PushButton(QPushButton):
     def __init__(self, type: Type = TypeContained, parent=None):
         super().__init__(parent)
 
-        self.state = PushButtonState(self)
         self.type = type
         self.debug = False
+        self._elevation = self.ElevationNone
 
         self.setClasses(type)
 
-        dirname = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(dirname, "push_button.css"), "r") as stylesheet:
-            self.setStyleSheet(stylesheet.read())
+        # Read and parsed once for all buttons.
+        stylesheets().register(STYLESHEET)
 
-        self._start_state_machine()
+        # One event filter tracks the state of all the buttons (see buttons.state_tracker),
+        # it sets self.state and applies the corresponding styles right away.
+        state_tracker.tracker().track(self)
 
-    def _start_state_machine(self) -> None:
-        """Ensures that the initial state is correct.
-
-        The button instance must be created before setEnabled() is called,
-        at which point its inital state becomes known.
-        The state machine must be started before its state transitions are acted upon.
-        """
-        QTimer.singleShot(200, lambda: self.state.start(self.isEnabled()))
-        QTimer.singleShot(200, lambda: self._connect_state_transitions())
-
-    def _connect_state_transitions(self) -> None:
-        # Connect the style updates to the changes of internal state.
-        self.state.resting.entered.connect(lambda: self.setStyles(self.StateEnabled))
-        if self.debug:
-            self.state.resting.entered.connect(lambda: print("resting"))
-        self.state.disabled.entered.connect(lambda: self.setStyles(self.StateDisabled))
-        if self.debug:
-            self.state.disabled.entered.connect(lambda: print("disabled"))
-        self.state.hoverFromResting.entered.connect(lambda: self.setStyles(self.StateHover))
-        if self.debug:
-            self.state.hoverFromResting.entered.connect(lambda: print("hoverFromResting"))
-        self.state.hoverFromFocusFromResting.entered.connect(lambda: self.setStyles(self.StateHover))
+    def enter_state(self, state: int) -> None:
+        """Called by the state tracker whenever the button enters a state."""
         if self.debug:
-            self.state.hoverFromFocusFromResting.entered.connect(lambda: print("hoverFromFocusFromResting"))
-        self.state.focusFromResting.entered.connect(lambda: self.setStyles(self.StateFocus))
-        if self.debug:
-            self.state.focusFromResting.entered.connect(lambda: print("focusFromResting"))
-        self.state.pressedFromHoverFromResting.entered.connect(lambda: self.setStyles(self.StatePressed))
-        if self.debug:
-            self.state.pressedFromHoverFromResting.entered.connect(lambda: print("pressedFromHoverFromResting"))
-        self.state.pressedFromFocusFromResting.entered.connect(lambda: self.setStyles(self.StatePressed))
-        if self.debug:
-            self.state.pressedFromFocusFromResting.entered.connect(lambda: print("pressedFromFocusFromResting"))
-        self.state.pressedFromHoverFromFocusFromResting.entered.connect(lambda: self.setStyles(self.StatePressed))
-        if self.debug:
-            self.state.pressedFromHoverFromFocusFromResting.entered.connect(lambda: print("pressedFromHoverFromFocusFromResting"))
+            print(state_tracker.STATES[state])
+        self.setStyles(self._styles[state])
 
     def setClasses(self, type: Type) -> None:
         """Set QSS class for styling purposes."""
@@ -259,14 +139,23 @@ class PushButton(QPushButton):
         This visual effect follows the Material Design 2 guidelines for buttons.
         See https://material.io/components/buttons.html#contained-button
 
-        The method contains some 'magic values' that control the appearance
+        The shadow is painted from a cached pixmap (see buttons.shadows),
+        rather than by a QGraphicsDropShadowEffect which would blur it
+        on every repaint. It can only spread over the button margins,
+        and is toned down to fit them.
+
+        The shadows module contains some 'magic values' that control the appearance
         of the shadow, based on the requested elevation. None of those needs
         to be used or modified by end-users, not even the elevation constants
         that are provided by this class.
         """
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setOffset(0, 1*value)
-        shadow.setBlurRadius(3*value)
-        shadow.setColor(QColor("#44000000"))
-        self.setGraphicsEffect(shadow)
-        self.update()
+        if value != self._elevation:
+            self._elevation = value
+            self.update()
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        if self._elevation:
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, shadows.shadow(self.size(), MARGINS, self._elevation))
+            painter.end()
+        super().paintEvent(event)
@@ -0,0 +1,77 @@
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+# These 'magic values' control the appearance of the shadows.
+# See PushButton.setElevation()
+COLOR = "#44000000"
+RADIUS = 4  # matches the border-radius in push_button.css
+
+
+def offset(elevation: int) -> int:
+    """How far below the widget its shadow is drawn."""
+    return 1 * elevation
+
+
+def blur_radius(elevation: int) -> int:
+    """How far the shadow spreads around the widget, when it has room to."""
+    return 3 * elevation
+
+
+def shadow(size: QSize, margins: QMargins, elevation: int) -> QPixmap:
+    """A drop shadow for a widget of a given size, to paint at its top left corner.
+
+    The shadow is cast by the widget without its margins, a rounded rectangle,
+    and it spreads over the margins only: unlike a QGraphicsDropShadowEffect,
+    the widget can't paint beyond its own edges, which would cut the blur short.
+    The blur is capped to what fits below the rectangle, and the shadow is
+    narrowed where the side margins are thinner than the blur.
+
+    Shadows are rendered once per size and elevation, then cached
+    (see QPixmapCache), so that painting them is cheap.
+    """
+    key = f"buttons.shadow:{size.width()}x{size.height()}-{margins.left()},{margins.top()},{margins.right()},{margins.bottom()}@{elevation}"
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        pixmap = _render(size, margins, elevation)
+        QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+
+def _reach(radius: int) -> int:
+    # QGraphicsBlurEffect spreads a little further than its radius.
+    return radius * 5 // 4 + 2 if radius else 0
+
+
+def _render(size: QSize, margins: QMargins, elevation: int) -> QPixmap:
+    # The edges of the widget stay clear by a pixel.
+    room = min(margins.top() + offset(elevation), margins.bottom() - offset(elevation)) - 1
+    radius = blur_radius(elevation)
+    while radius and _reach(radius) > room:
+        radius -= 1
+    narrowing = max(0, _reach(radius) + 1 - min(margins.left(), margins.right()))
+    rect = QRect(QPoint(), size).marginsRemoved(margins).translated(0, offset(elevation)).adjusted(narrowing, 0, -narrowing, 0)
+
+    shape = QPixmap(size)
+    shape.fill(Qt.transparent)
+    painter = QPainter(shape)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setPen(Qt.NoPen)
+    painter.setBrush(QColor(COLOR))
+    painter.drawRoundedRect(QRectF(rect), RADIUS, RADIUS)
+    painter.end()
+
+    # Let the graphics view framework do the blurring, once.
+    item = QGraphicsPixmapItem(shape)
+    blur = QGraphicsBlurEffect()
+    blur.setBlurRadius(radius)
+    item.setGraphicsEffect(blur)
+    scene = QGraphicsScene()
+    scene.addItem(item)
+
+    result = QPixmap(shape.size())
+    result.fill(Qt.transparent)
+    painter = QPainter(result)
+    scene.render(painter, QRectF(result.rect()), QRectF(shape.rect()))
+    painter.end()
+    return result
@@ -0,0 +1,148 @@
+import weakref
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+import tracing
+
+# The states of a button and the events that change them are indices
+# into the transition table. A button's state fits in a byte.
+STATES = (
+    "disabled",
+    "resting",
+    "hoverFromResting",
+    "pressedFromHoverFromResting",
+    "focusFromResting",
+    "pressedFromFocusFromResting",
+    "hoverFromFocusFromResting",
+    "pressedFromHoverFromFocusFromResting",
+)
+(disabled, resting, hoverFromResting, pressedFromHoverFromResting, focusFromResting,
+ pressedFromFocusFromResting, hoverFromFocusFromResting, pressedFromHoverFromFocusFromResting) = range(len(STATES))
+
+_hover_enter, _hover_leave, _mouse_press, _mouse_release, _focus_in, _focus_out, _key_press, _key_release = range(8)
+
+_transitions = {
+    resting: {_hover_enter: hoverFromResting, _focus_in: focusFromResting},
+    hoverFromResting: {_hover_leave: resting, _mouse_press: pressedFromHoverFromResting},
+    pressedFromHoverFromResting: {_mouse_release: hoverFromFocusFromResting},
+    focusFromResting: {_focus_out: resting, _key_press: pressedFromFocusFromResting, _hover_enter: hoverFromFocusFromResting},
+    pressedFromFocusFromResting: {_key_release: focusFromResting},
+    hoverFromFocusFromResting: {
+        _hover_leave: focusFromResting,
+        _focus_out: hoverFromResting,
+        _mouse_press: pressedFromHoverFromFocusFromResting,
+        _key_press: pressedFromHoverFromFocusFromResting,
+    },
+    pressedFromHoverFromFocusFromResting: {_mouse_release: hoverFromFocusFromResting, _key_release: hoverFromFocusFromResting},
+}
+_table = [[_transitions.get(state, {}).get(event) for event in range(8)] for state in range(len(STATES))]
+
+_events = {
+    QEvent.HoverEnter: _hover_enter,
+    QEvent.HoverLeave: _hover_leave,
+    QEvent.MouseButtonPress: _mouse_press,
+    QEvent.MouseButtonRelease: _mouse_release,
+    QEvent.FocusIn: _focus_in,
+    QEvent.FocusOut: _focus_out,
+    QEvent.KeyPress: _key_press,
+    QEvent.KeyRelease: _key_release,
+}
+
+
+class StateTracker(QObject):
+    """Keeps track of the state of buttons for styling purposes.
+
+    There should be no need for you to use this class directly.
+
+    A disabled button doesn't react to user interaction. An enabled button
+    can be in a resting state, be subject to hover, focus, or be pressed.
+    These states follow the Material Design 2 guidelines.
+    See https://material.io/components/buttons.html
+
+    A single event filter, installed on the application, tracks all the buttons.
+    Each button only stores the index of its current state, and is notified
+    synchronously when it enters a new one: tracked widgets must implement
+    enter_state(state).
+
+    Paste the following state chart in https://mermaid.live for
+    a visual representation of the behavior implemented by this class!
+
+    stateDiagram-v2
+      [*] --> enabled
+      enabled --> disabled: EnabledChange
+      disabled --> enabled: EnabledChange
+
+      state enabled {
+        [*] --> resting
+        resting --> hoverFromResting: HoverEnter
+        hoverFromResting --> resting: HoverLeave
+
+        hoverFromResting --> pressedFromHoverFromResting: MouseButtonPress
+        pressedFromHoverFromResting --> hoverFromFocusFromResting: MouseButtonRelease
+
+        resting --> focusFromResting: FocusIn
+        focusFromResting --> resting: FocusOut
+
+        focusFromResting --> pressedFromFocusFromResting: KeyPress
+        pressedFromFocusFromResting --> focusFromResting: KeyRelease
+
+        focusFromResting --> hoverFromFocusFromResting: HoverEnter
+        hoverFromFocusFromResting --> focusFromResting: HoverLeave
+
+        hoverFromFocusFromResting --> hoverFromResting: FocusOut
+
+        hoverFromFocusFromResting --> pressedFromHoverFromFocusFromResting: MouseButtonPress
+        pressedFromHoverFromFocusFromResting --> hoverFromFocusFromResting: MouseButtonRelease
+
+        hoverFromFocusFromResting --> pressedFromHoverFromFocusFromResting: KeyPress
+        pressedFromHoverFromFocusFromResting --> hoverFromFocusFromResting: KeyRelease
+      }
+
+    Only the left mouse button and the Space key press buttons.
+    """
+
+    def __init__(self, app: QApplication):
+        super().__init__(app)
+        self._buttons = weakref.WeakSet()
+        app.installEventFilter(self)
+
+    def track(self, button: QWidget) -> None:
+        """Start tracking a button, it enters its initial state immediately."""
+        self._buttons.add(button)
+        self._enter(button, resting if button.isEnabled() else disabled)
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        # Called for every event of the application, keep the common case cheap.
+        type = event.type()
+        if type == QEvent.EnabledChange:
+            if watched in self._buttons:
+                self._enter(watched, resting if watched.isEnabled() else disabled)
+            return False
+        index = _events.get(type)
+        if index is None or watched not in self._buttons:
+            return False
+        if index == _mouse_press and event.button() != Qt.LeftButton:
+            return False
+        if index in (_key_press, _key_release) and event.key() != Qt.Key_Space:
+            return False
+        target = _table[watched.state][index]
+        if target is not None:
+            self._enter(watched, target)
+        return False
+
+    @staticmethod
+    def _enter(button: QWidget, state: int) -> None:
+        button.state = state
+        tracing.call("button", STATES[state], button.enter_state, state)
+
+
+_tracker = None
+
+
+def tracker() -> StateTracker:
+    """The state tracker of the application, there must be a QApplication."""
+    global _tracker
+    if _tracker is None:
+        _tracker = StateTracker(QApplication.instance())
+    return _tracker
@@ -0,0 +1,75 @@
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+
+class StyleSheetRegistry(QObject):
+    """Applies widget stylesheets once for the whole application.
+
+    Setting a stylesheet on each widget makes Qt parse it for each widget.
+    Instead, each stylesheet file is read once, and all of them are applied
+    to the QApplication, along with whatever stylesheet it had already.
+    That works as long as the stylesheets only select the widgets
+    they are meant for (e.g. by their "class" property).
+
+    For development purposes, the files can be watched and reloaded
+    whenever they change, see set_hot_reload().
+    """
+
+    def __init__(self, app: QApplication):
+        super().__init__(app)
+
+        self._app = app
+        self._base = app.styleSheet()
+        self._sheets = {}
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._hot_reload = False
+
+    def register(self, path: str) -> None:
+        """Apply the stylesheet from a file, unless it was already registered."""
+        if path in self._sheets:
+            return
+        self._sheets[path] = self._read(path)
+        if self._hot_reload:
+            self._watcher.addPath(path)
+        self._apply()
+
+    def set_hot_reload(self, enabled: bool) -> None:
+        """Set whether changes to the registered files are applied immediately."""
+        self._hot_reload = enabled
+        if enabled and self._sheets:
+            self._watcher.addPaths(list(self._sheets))
+        elif self._watcher.files():
+            self._watcher.removePaths(self._watcher.files())
+
+    @pyqtSlot(str)
+    def _on_file_changed(self, path: str) -> None:
+        # Editors often replace files rather than writing them,
+        # in which case they need to be watched again.
+        if path not in self._watcher.files():
+            self._watcher.addPath(path)
+        try:
+            self._sheets[path] = self._read(path)
+        except OSError:
+            return  # probably being saved, there will be another notification
+        self._apply()
+
+    def _apply(self) -> None:
+        self._app.setStyleSheet("\n".join([self._base] + list(self._sheets.values())))
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, "r") as stylesheet:
+            return stylesheet.read()
+
+
+_registry = None
+
+
+def registry() -> StyleSheetRegistry:
+    """The stylesheet registry of the application, there must be a QApplication."""
+    global _registry
+    if _registry is None:
+        _registry = StyleSheetRegistry(QApplication.instance())
+    return _registry
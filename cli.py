@@ -0,0 +1,171 @@
+"""Export files to a USB device without any user interface, e.g. from a script.
+
+The device is monitored, unlocked and exported to exactly like in the wizard
+(see core.Core), only the wizard is replaced by this batch. Progress is
+reported on the standard output, one JSON object per line, for example:
+
+    {"event": "state", "state": "locked"}
+    {"event": "progressed", "written": 1048576, "total": 4194304}
+    {"event": "succeeded"}
+
+The exit status is 0 when the export succeeded, 1 otherwise.
+
+    python cli.py --device usb-Vendor_Model_0123-0:0 --unlock-command "..." path/to/files
+    python cli.py --manifest files.txt --passphrase-fd 3 3<passphrase.txt
+"""
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from PyQt5.QtCore import *
+
+from core import Core
+import export.archive
+from device import Device, Monitor
+from device.monitor import BLOCK_DIRECTORY, DEVICES_DIRECTORY, MOUNTS_FILE
+
+# How often to check whether an unlocked device was mounted.
+MOUNT_POLLING_INTERVAL_IN_MS = 100
+
+
+class Batch(QObject):
+    """Drives the core from the first device check to the end of the export."""
+
+    def __init__(self, core: Core, passphrase_fd: int, timeout: int, parent=None):
+        super().__init__(parent)
+
+        self._core = core
+        self._passphrase_fd = passphrase_fd
+        self._unlocking_attempted = False
+        self._exporting = False
+
+        core.device.state_changed.connect(self._on_device_state_changed)
+        core.export_service.scanned.connect(lambda files, size: _report("scanned", files=files, size=size))
+        core.export_service.file_exported.connect(lambda name: _report("file_exported", name=name))
+        core.export_service.progressed.connect(lambda written, total: _report("progressed", written=written, total=total))
+        core.export_service.succeeded.connect(self._on_export_succeeded)
+        core.export_service.failed.connect(self._on_export_failed)
+
+        # The unlock command may leave mounting the device to something else.
+        self._mount_timer = QTimer(self)
+        self._mount_timer.setInterval(MOUNT_POLLING_INTERVAL_IN_MS)
+        self._mount_timer.timeout.connect(self._start_export)
+
+        # The device must be ready to export to in time, the export itself can take as long as it takes.
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(timeout)
+        self._timer.timeout.connect(lambda: self._fail("The USB device wasn't ready in time."))
+
+    def start(self) -> None:
+        self._timer.start()
+        self._core.export_service.scan()
+
+    @pyqtSlot(str)
+    def _on_device_state_changed(self, state: Device.State) -> None:
+        if self._exporting:
+            return  # the export service reports what that means
+        _report("state", state=state)
+        self._mount_timer.stop()
+
+        if state == Device.UnlockedState:
+            self._mount_timer.start()
+            self._start_export()
+        elif state == Device.LockedState and self._core.unlocker is not None:
+            if self._unlocking_attempted:
+                self._fail(self._core.unlocker.failure or "The passphrase was rejected.")
+                return
+            passphrase = self._read_passphrase()
+            if passphrase is None:
+                self._fail("No passphrase was provided.")
+                return
+            self._unlocking_attempted = True
+            self._core.device.attempt_unlocking(passphrase)
+        # Otherwise, wait for the device to be plugged in, or unlocked by other means.
+
+    def _read_passphrase(self) -> Optional[str]:
+        # Only one passphrase is read, there is no one to ask for another.
+        with os.fdopen(self._passphrase_fd, "r", closefd=False) as file:
+            line = file.readline()
+        return line.rstrip("\n") if line else None
+
+    @pyqtSlot()
+    def _start_export(self) -> None:
+        if self._core.device.mount_point is None:
+            return
+        self._mount_timer.stop()
+        self._timer.stop()
+        self._exporting = True
+        _report("started", mount_point=self._core.device.mount_point)
+        self._core.export_service.start()
+
+    @pyqtSlot()
+    def _on_export_succeeded(self) -> None:
+        if self._exporting:
+            _report("succeeded")
+            QCoreApplication.exit(0)
+
+    @pyqtSlot()
+    def _on_export_failed(self) -> None:
+        # The service also fails when the device isn't unlocked (yet), which only matters once exporting.
+        if self._exporting:
+            self._fail(self._core.export_service.failure or "The export failed.")
+
+    def _fail(self, reason: str) -> None:
+        self._mount_timer.stop()
+        self._timer.stop()
+        _report("failed", reason=reason)
+        QCoreApplication.exit(1)
+
+
+def _report(event: str, **details) -> None:
+    print(json.dumps(dict(event=event, **details)), flush=True)
+
+
+def _read_manifest(path: str) -> List[str]:
+    """One path per line, relative to the manifest. Blank lines and lines starting with # are ignored."""
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path) as file:
+        lines = [line.strip() for line in file]
+    return [os.path.join(directory, line) for line in lines if line and not line.startswith("#")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export files to a USB device, without any user interface.")
+    parser.add_argument("files", nargs="*", help="the files (or directories) to export")
+    parser.add_argument("--manifest", help="a file listing the files to export, one per line")
+    parser.add_argument("--device", help=f"the name of the USB device in {DEVICES_DIRECTORY} (by default, any USB device)")
+    parser.add_argument("--unlock-command", default=os.environ.get("WIZARD_UNLOCK_COMMAND"),
+                        help="the command that unlocks the device, see device.Unlocker (by default, $WIZARD_UNLOCK_COMMAND)")
+    parser.add_argument("--passphrase-fd", type=int, default=0, help="where to read the passphrase from (by default, the standard input)")
+    parser.add_argument("--archive", choices=[export.archive.Tar, export.archive.CompressedTar],
+                        help="export the files into a single archive of that format (by default, they're exported as they are)")
+    parser.add_argument("--timeout", type=float, default=60, help="how long to wait for the device, in seconds (by default, 60)")
+    parser.add_argument("--devices-directory", default=DEVICES_DIRECTORY, help=argparse.SUPPRESS)
+    parser.add_argument("--mounts-directory", help=argparse.SUPPRESS)
+    parser.add_argument("--mounts-file", default=MOUNTS_FILE, help=argparse.SUPPRESS)
+    parser.add_argument("--block-directory", default=BLOCK_DIRECTORY, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    files = list(arguments.files)
+    if arguments.manifest:
+        files += _read_manifest(arguments.manifest)
+    if not files:
+        parser.error("no files to export")
+
+    app = QCoreApplication(sys.argv[:1])
+    core = Core(files, unlock_command=arguments.unlock_command, archive=arguments.archive)
+    batch = Batch(core, arguments.passphrase_fd, int(arguments.timeout * 1000))
+    monitor = Monitor(core.device, arguments.devices_directory, arguments.mounts_directory, device_id=arguments.device,
+                      mounts_file=arguments.mounts_file, block_directory=arguments.block_directory)
+
+    # Once the event loop runs, so that failing early can end it.
+    QTimer.singleShot(0, batch.start)
+    QTimer.singleShot(0, monitor.start)
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import shlex
+from typing import List, Optional
+
+from device import Device, Unlocker
+import export
+import export.archive
+
+
+class Core:
+    """The device and the export service, without any user interface.
+
+    Nothing here depends on QtGui or QtWidgets: a QCoreApplication
+    (for its event loop) is enough, for example on a headless kiosk.
+    User interfaces, like the wizard and the simulators, are views
+    on top of the core, they only need its device and export service.
+    """
+
+    def __init__(self, files: List[str], unlock_command: Optional[str] = None, archive: Optional[export.archive.Format] = None):
+        self.device = Device()
+
+        # Passphrases are checked by a command when there is one,
+        # otherwise by whatever drives the device (e.g. the simulator).
+        self.unlocker = None
+        if unlock_command:
+            self.unlocker = Unlocker(self.device, shlex.split(unlock_command))
+
+        self.export_service = export.Service(self.device)
+        self.export_service.set_files(files)
+        self.export_service.set_incremental(True)
+        self.export_service.set_verification(True)
+        self.export_service.set_archive(archive)
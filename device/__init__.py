@@ -1,2 +1,12 @@
 from .main import Device
-from .simulator import Simulator
+from .monitor import Monitor
+from .registry import Registry
+from .unlocker import Unlocker
+
+
+def __getattr__(name: str):
+    # The simulator is made of widgets, only import them when it's used.
+    if name == "Simulator":
+        from .simulator import Simulator
+        return Simulator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,10 +1,12 @@
-from typing import NewType
+import collections
+import functools
+from typing import Callable, Dict, NewType, Optional
 
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
-from PyQt5.QtWidgets import *
 
-class _State(QWidget):
+import tracing
+
+class _State:
     """
     Paste the following state chart in https://mermaid.live for
     a visual representation of the behavior implemented by this class!
@@ -29,58 +31,52 @@ class _State(QWidget):
 
       locked --> unlocked: unlocking_succeeded
       unlocked --> locked: locked
-    """
-    def __init__(self, device: "Device"):
-        super().__init__()
-
-        self._device = device
-
-        # Declare the state chart described in the docstring.
-        # See https://doc.qt.io/qt-5/statemachine-api.html
-        #
-        # This is a very declarative exercise.
-        # The state names are part of the API of this class.
-        self._machine = QStateMachine()
-
-        self.unknown = QState()
-        self.missing = QState()
-        self.locked = QState()
-        self.unlocked = QState()
-
-        self.unknown.addTransition(self._device.found_unlocked, self.unlocked)
-        self.unknown.addTransition(self._device.found_locked, self.locked)
-        self.unknown.addTransition(self._device.not_found, self.missing)
-
-        self.missing.addTransition(self._device.found_unlocked, self.unlocked)
-        self.missing.addTransition(self._device.found_locked, self.locked)
-
-        self.locked.addTransition(self._device.not_found, self.missing)
-        self.unlocked.addTransition(self._device.not_found, self.missing)
-
-        self.resting = QState(self.locked)
-        self.unlocking = QState(self.locked)
-
-        self.locked.setInitialState(self.resting)
-        self.resting.addTransition(self._device.unlocking_started, self.unlocking)
-        self.unlocking.addTransition(self._device.unlocking_failed, self.resting)
 
-        self.locked.addTransition(self._device.unlocking_succeeded, self.unlocked)
-        self.unlocked.addTransition(self._device.locked, self.locked)
-
-        self._machine.addState(self.unknown)
-        self._machine.addState(self.missing)
-        self._machine.addState(self.locked)
-        self._machine.addState(self.unlocked)
-        self._machine.setInitialState(self.unknown)
+    The chart is implemented as a transition table, rather than with
+    QStateMachine, so that transitions are synchronous and don't allocate.
+    Only the leaf states are part of the table: the locked state is
+    either resting or unlocking.
+    """
 
-        self._machine.start()
+    # The states and events are indices into the transition table.
+    # The state names are part of the API of this class.
+    unknown, missing, resting, unlocking, unlocked = range(5)
+    names = ("unknown", "missing", "resting", "unlocking", "unlocked")
+    found_locked, found_unlocked, not_found, unlocking_started, unlocking_failed, unlocking_succeeded, locked = range(7)
+    _state_count, _event_count = 5, 7
+
+    _transitions = {
+        unknown: {found_unlocked: unlocked, found_locked: resting, not_found: missing},
+        missing: {found_unlocked: unlocked, found_locked: resting},
+        resting: {not_found: missing, unlocking_started: unlocking, unlocking_succeeded: unlocked},
+        unlocking: {not_found: missing, unlocking_failed: resting, unlocking_succeeded: unlocked},
+        unlocked: {not_found: missing, locked: resting},
+    }
+
+    def __init__(self, on_entered: Callable[[int], None]):
+        self._table = [[self._transitions[state].get(event) for event in range(self._event_count)] for state in range(self._state_count)]
+        self._on_entered = on_entered
+        self.current = _State.unknown
+        self._on_entered(self.current)
+
+    def fire(self, event: int) -> bool:
+        """Transition on an event, return whether a transition happened."""
+        # Negative indices would silently stand for other events.
+        if not 0 <= event < _State._event_count:
+            raise ValueError(f"Unknown event: {event!r}")
+        target = self._table[self.current][event]
+        if target is None:
+            return False
+        self.current = target
+        self._on_entered(target)
+        return True
 
 
 class Device(QObject):
 
     # These signals are part of the device private API.
     # They are used internally to keep track of the device state by
-    # triggering state machine transitions in the _State instance.
+    # triggering transitions in the _State instance.
     #
     # In this demo, the simulator connects to this API, but that's a hack.
     found_locked = pyqtSignal()
@@ -108,31 +104,95 @@ class Device(QObject):
     def __init__(self):
         super().__init__()
 
-        self._state = _State(self)
+        self._mount_point = None
+        self._current_state = Device.UnknownState
+        self._published_state = Device.UnknownState
+
+        # See set_coalescing_window()
+        self._coalescing_timer = QTimer(self)
+        self._coalescing_timer.setSingleShot(True)
+        self._coalescing_timer.timeout.connect(self._publish_state)
+        self._suppressed = collections.Counter()
 
         # Track changes of state for public consumption.
-        self._state.unknown.entered.connect(self._on_unknown_state_entered)
-        self._state.missing.entered.connect(self._on_missing_state_entered)
-        self._state.unlocking.entered.connect(self._on_unlocking_state_entered)
-        self._state.resting.entered.connect(self._on_locked_state_entered)
-        self._state.unlocked.entered.connect(self._on_unlocked_state_entered)
+        self._on_state_entered = [
+            self._on_unknown_state_entered,
+            self._on_missing_state_entered,
+            self._on_locked_state_entered,
+            self._on_unlocking_state_entered,
+            self._on_unlocked_state_entered,
+        ]
+        self._state = _State(lambda state: tracing.call("state", _State.names[state], self._on_state_entered[state]))
+
+        # Trigger the transitions (synchronously).
+        for signal, event in [
+            (self.found_locked, _State.found_locked),
+            (self.found_unlocked, _State.found_unlocked),
+            (self.not_found, _State.not_found),
+            (self.unlocking_started, _State.unlocking_started),
+            (self.unlocking_failed, _State.unlocking_failed),
+            (self.unlocking_succeeded, _State.unlocking_succeeded),
+            (self.locked, _State.locked),
+        ]:
+            signal.connect(functools.partial(self._state.fire, event))
 
     @property
     def state(self) -> "Device.State":
-        return self._current_state
+        return self._published_state
+
+    @property
+    def suppressed_transitions(self) -> Dict["Device.State", int]:
+        """How many times each state was entered without state_changed being emitted."""
+        return dict(self._suppressed)
+
+    def set_coalescing_window(self, milliseconds: int) -> None:
+        """Collapse bursts of state changes, e.g. due to a flaky USB connector.
+
+        When a change of state happens, the following ones are collected
+        for the given time, then state_changed is emitted once with the
+        final state, if it differs from the previously published state.
+        The state property only reflects the published states.
+        A window of 0 (the default) disables coalescing.
+        """
+        self._coalescing_timer.setInterval(milliseconds)
+        if milliseconds <= 0 and self._coalescing_timer.isActive():
+            self._coalescing_timer.stop()
+            self._publish_state()
+
+    @property
+    def mount_point(self) -> Optional[str]:
+        """The directory where the unlocked device is mounted, if known."""
+        return self._mount_point
+
+    def set_mount_point(self, path: Optional[str]) -> None:
+        # Like the signals above, this is meant for whatever monitors the device.
+        self._mount_point = path
 
     def emit_state_changed(func):
         def decorated(self):
+            if self._coalescing_timer.isActive():
+                self._suppressed[self._current_state] += 1  # superseded by this change
             func(self)
-            self.state_changed.emit(self._current_state)
+            if self._coalescing_timer.interval() <= 0:
+                self._publish_state()
+            elif not self._coalescing_timer.isActive():
+                self._coalescing_timer.start()
         return decorated
 
+    @pyqtSlot()
+    def _publish_state(self) -> None:
+        if self._coalescing_timer.interval() > 0 and self._current_state == self._published_state:
+            self._suppressed[self._current_state] += 1  # back to where it started
+            return
+        self._published_state = self._current_state
+        tracing.emit(self.state_changed, self._published_state)
+
     def attempt_unlocking(self, passphrase: str) -> None:
-        self.unlocking_started.emit(passphrase)
+        tracing.emit(self.unlocking_started, passphrase, redacted=True)
 
     @emit_state_changed
     def _on_missing_state_entered(self) -> None:
-        if self.state == Device.UnknownState:
+        if self._current_state == Device.UnknownState:
             self._current_state = Device.MissingState
         else:
             # We can get subtle because we have access
@@ -176,20 +236,20 @@ class Device(QObject):
         """This method is specific to the demonstration code."""
         #print("Simulating a device check...")
         if desired_result == Device.EmitFoundLocked:
-            self.found_locked.emit()
+            tracing.emit(self.found_locked)
             #print("Locked device found.")
         if desired_result == Device.EmitFoundUnlocked:
-            self.found_unlocked.emit()
+            tracing.emit(self.found_unlocked)
             #print("Unlocked device found.")
         if desired_result == Device.EmitNotFound:
             #print("Device not found.")
-            self.not_found.emit()
+            tracing.emit(self.not_found)
         if desired_result == Device.EmitUnlockingSucceeded:
             #print("Device successfully unlocked.")
-            self.unlocking_succeeded.emit()
+            tracing.emit(self.unlocking_succeeded)
         if desired_result == Device.EmitUnlockingFailed:
             #print("Device unlocking failed.")
-            self.unlocking_failed.emit()
+            tracing.emit(self.unlocking_failed)
         if desired_result == Device.EmitLocked:
             #print("Device locked.")
-            self.locked.emit()
+            tracing.emit(self.locked)
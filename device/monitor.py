@@ -0,0 +1,176 @@
+import getpass
+import os
+import re
+from typing import List, NewType, Optional, Set
+
+from PyQt5.QtCore import *
+
+import tracing
+from .main import Device
+
+DEVICES_DIRECTORY = "/dev/disk/by-id"
+# Where unlocked devices are mounted, under a directory named after the user (see mounts_directory()).
+MOUNTS_PARENT_DIRECTORY = "/media"
+MOUNTS_FILE = "/proc/mounts"
+BLOCK_DIRECTORY = "/sys/class/block"
+USB_PREFIX = "usb-"
+
+
+class Monitor(QObject):
+    """Keeps a Device up-to-date with the USB devices that are plugged in.
+
+    The monitor watches two directories, and doesn't do anything until
+    they change. On Linux, QFileSystemWatcher relies on inotify, where
+    it's not available it polls them.
+
+    - The devices directory is expected to follow the udev layout of
+      /dev/disk/by-id, where USB block devices (and their partitions)
+      have entries starting with "usb-".
+    - The mounts directory is where unlocked devices are mounted,
+      for example /media/<user>. Mount points appearing there is
+      what tells the monitor to look for the device's.
+
+    Any USB device will do, unless the monitor is given the name
+    of a specific one in the devices directory (its device_id).
+
+    A USB device that is present but not mounted is considered locked.
+    Its mount point is looked up in the mounts file (/proc/mounts),
+    as the mount point of its block node, of one of its partitions,
+    or of whatever holds them in sysfs (e.g. a dm-crypt mapping).
+    All these paths can be anywhere, for example in a temporary directory
+    for testing purposes, with symbolic links standing in for devices
+    and directories standing in for sysfs.
+    """
+
+    State = NewType("State", str)
+    Missing = State("missing")
+    Locked = State("locked")
+    Unlocked = State("unlocked")
+
+    def __init__(self, device: Device, devices_directory: str = DEVICES_DIRECTORY, mounts_directory: Optional[str] = None, device_id: Optional[str] = None,
+                 mounts_file: str = MOUNTS_FILE, block_directory: str = BLOCK_DIRECTORY, parent=None):
+        super().__init__(parent)
+
+        self._device = device
+        self._device_id = device_id
+        self._devices_directory = devices_directory
+        self._mounts_directory = mounts_directory if mounts_directory is not None else default_mounts_directory()
+        self._mounts_file = mounts_file
+        self._block_directory = block_directory
+        self._state = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+
+    def start(self) -> None:
+        """Report the current state of the device, then keep watching."""
+        self._watch()
+        self._update()
+
+    @pyqtSlot(str)
+    def _on_directory_changed(self, path: str) -> None:
+        self._watch()
+        self._update()
+
+    def _watch(self) -> None:
+        # The directories may not exist yet, e.g. /dev/disk/by-id is created
+        # along with the first disk. Watching their parents allows noticing.
+        for directory in [self._devices_directory, self._mounts_directory]:
+            for path in [directory, os.path.dirname(directory)]:
+                if os.path.isdir(path) and path not in self._watcher.directories():
+                    self._watcher.addPath(path)
+
+    def _update(self) -> None:
+        mount_point = None
+        devices = self._find_devices()
+        if not devices:
+            state = Monitor.Missing
+        else:
+            mount_point = self._find_mount_point(devices)
+            state = Monitor.Locked if mount_point is None else Monitor.Unlocked
+
+        previous = self._state
+        self._state = state
+        self._device.set_mount_point(mount_point)
+        if state == previous:
+            return
+
+        # Translate the changes into the transitions of the device state chart.
+        if state == Monitor.Missing:
+            tracing.emit(self._device.not_found)
+        elif state == Monitor.Locked:
+            if previous == Monitor.Unlocked:
+                tracing.emit(self._device.locked)
+            else:
+                tracing.emit(self._device.found_locked)
+        else:
+            if previous == Monitor.Locked:
+                tracing.emit(self._device.unlocking_succeeded)
+            else:
+                tracing.emit(self._device.found_unlocked)
+
+    def _find_devices(self) -> List[str]:
+        """The paths of the devices in the devices directory, usually symbolic links to their block nodes."""
+        if self._device_id is not None:
+            path = os.path.join(self._devices_directory, self._device_id)
+            return [path] if os.path.exists(path) else []
+        try:
+            with os.scandir(self._devices_directory) as entries:
+                return [entry.path for entry in entries if entry.name.startswith(USB_PREFIX)]
+        except OSError:
+            return []
+
+    def _find_mount_point(self, devices: List[str]) -> Optional[str]:
+        nodes = set()
+        for path in devices:
+            nodes |= self._block_nodes(os.path.basename(os.path.realpath(path)))
+        mount_points = []
+        try:
+            with open(self._mounts_file) as mounts:
+                for line in mounts:
+                    fields = line.split()
+                    # Only sources that are paths can be block nodes, unlike e.g. "proc" or "tmpfs".
+                    if len(fields) < 2 or not fields[0].startswith("/"):
+                        continue
+                    if os.path.basename(os.path.realpath(_unescape(fields[0]))) in nodes:
+                        mount_points.append(_unescape(fields[1]))
+        except OSError:
+            return None
+        return min(mount_points) if mount_points else None
+
+    def _block_nodes(self, name: str) -> Set[str]:
+        """The names of a block node, of its partitions, and of what holds any of them, e.g. sdb, sdb1 and dm-0."""
+        nodes = set()
+        pending = [name]
+        while pending:
+            node = pending.pop()
+            if node in nodes:
+                continue
+            nodes.add(node)
+            directory = os.path.join(self._block_directory, node)
+            try:
+                with os.scandir(directory) as entries:
+                    # Partitions are subdirectories named after their disk, e.g. sdb/sdb1 or nvme0n1/nvme0n1p1.
+                    pending += [entry.name for entry in entries if entry.name.startswith(node) and entry.is_dir()]
+            except OSError:
+                pass
+            try:
+                pending += os.listdir(os.path.join(directory, "holders"))
+            except OSError:
+                pass
+        return nodes
+
+
+def default_mounts_directory() -> str:
+    """Where unlocked devices are mounted by default, /media/<user>."""
+    # Looked up when needed rather than at import: there may be no user name,
+    # e.g. in a container running as a user that isn't in /etc/passwd.
+    try:
+        return os.path.join(MOUNTS_PARENT_DIRECTORY, getpass.getuser())
+    except (KeyError, OSError):
+        return MOUNTS_PARENT_DIRECTORY
+
+
+def _unescape(field: str) -> str:
+    # Spaces and such are escaped as octal sequences in the mounts file, e.g. \040.
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), field)
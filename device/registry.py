@@ -0,0 +1,61 @@
+import functools
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import *
+
+from .main import Device
+
+
+class Registry(QObject):
+    """Keeps track of several devices, each with its own state.
+
+    Devices are identified by a string, for example their name
+    in /dev/disk/by-id. Each of them is a Device, driven like any
+    Device would be (see device.Monitor and device.Unlocker).
+    The registry only reports what happens to all of them.
+    """
+
+    # The identifier of a device.
+    added = pyqtSignal(str)
+    removed = pyqtSignal(str)
+    # The identifier of a device, and its new state.
+    state_changed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._devices = {}
+
+    def add(self, id: str) -> Device:
+        """Start tracking a device, unless it's tracked already, and return it."""
+        device = self._devices.get(id)
+        if device is None:
+            device = Device()
+            device.setParent(self)
+            device.state_changed.connect(functools.partial(self._on_device_state_changed, id))
+            self._devices[id] = device
+            self.added.emit(id)
+        return device
+
+    def remove(self, id: str) -> None:
+        """Stop tracking a device, e.g. once it's missing."""
+        device = self._devices.pop(id, None)
+        if device is not None:
+            self.removed.emit(id)
+            device.deleteLater()
+
+    def device(self, id: str) -> Optional[Device]:
+        return self._devices.get(id)
+
+    def ids(self) -> List[str]:
+        return list(self._devices)
+
+    def mount_points(self) -> Dict[str, str]:
+        """The mount points of the unlocked devices, by identifier."""
+        return {
+            id: device.mount_point
+            for id, device in self._devices.items()
+            if device.state == Device.UnlockedState and device.mount_point is not None
+        }
+
+    def _on_device_state_changed(self, id: str, state: Device.State) -> None:
+        self.state_changed.emit(id, state)
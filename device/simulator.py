@@ -1,8 +1,8 @@
 import sys
+import tempfile
 from typing import List
 
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 from buttons import PushButton
@@ -17,6 +17,9 @@ class Simulator(QWidget):
 
         self._device = device
 
+        # The simulated USB drive is a temporary directory.
+        self._device.set_mount_point(tempfile.mkdtemp(prefix="wizard-usb-"))
+
         # Connect the device.
         self._device.not_found.connect(self._on_device_not_found)
         self._device.found_locked.connect(self._on_device_found_locked)
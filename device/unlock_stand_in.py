@@ -0,0 +1,33 @@
+"""Stands in for an unlock command, for testing purposes (see device.Unlocker).
+
+Reads a passphrase from its standard input, derives a key from it for a while
+(as cryptsetup or veracrypt would), then succeeds if it was the expected one.
+
+    python -m device.unlock_stand_in [--passphrase PASSPHRASE] [--seconds SECONDS]
+"""
+import argparse
+import hashlib
+import sys
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--passphrase", default="passphrase", help="the passphrase that unlocks the device")
+    parser.add_argument("--seconds", type=float, default=2, help="how long key derivation takes")
+    arguments = parser.parse_args()
+
+    passphrase = sys.stdin.readline().rstrip("\n")
+
+    # Keep a core busy, like an actual key derivation function.
+    deadline = time.monotonic() + arguments.seconds
+    key = passphrase.encode()
+    while time.monotonic() < deadline:
+        key = hashlib.pbkdf2_hmac("sha256", key, b"salt", 10000)
+
+    if passphrase != arguments.passphrase:
+        sys.exit("No key available with this passphrase.")
+
+
+if __name__ == "__main__":
+    main()
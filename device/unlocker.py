@@ -0,0 +1,109 @@
+from typing import List, Optional
+
+from PyQt5.QtCore import *
+
+import tracing
+from .main import Device
+
+# Key derivation is slow on purpose, but not that slow.
+TIMEOUT_IN_MS = 60000
+
+
+class Unlocker(QObject):
+    """Unlocks the device with an external command, whenever unlocking is attempted.
+
+    The command is run in its own process, so that key derivation (which
+    takes seconds for LUKS or VeraCrypt) never blocks the event loop.
+    The passphrase is written to its standard input, followed by a newline,
+    for example:
+
+        cryptsetup open --type luks --key-file - /dev/sdb secure-usb
+
+    A zero exit status means that the device was unlocked. Any other outcome
+    means it wasn't, including the command not finishing in time.
+    If the device is removed meanwhile, the command is killed and
+    its outcome is ignored.
+    """
+
+    def __init__(self, device: Device, command: List[str], timeout: int = TIMEOUT_IN_MS, parent=None):
+        super().__init__(parent)
+
+        self._device = device
+        self._command = list(command)
+        self._failure = None
+
+        self._process = QProcess(self)
+        self._process.finished.connect(self._on_process_finished)
+        self._process.errorOccurred.connect(self._on_process_error)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(timeout)
+        self._timer.timeout.connect(self._on_timeout)
+
+        self._device.unlocking_started.connect(self._start)
+        self._device.state_changed.connect(self._on_device_state_changed)
+
+    @property
+    def failure(self) -> Optional[str]:
+        """Why the last attempt failed, when known."""
+        return self._failure
+
+    def set_timeout(self, milliseconds: int) -> None:
+        """Set how long the command may run, for the next attempts."""
+        self._timer.setInterval(milliseconds)
+
+    def is_running(self) -> bool:
+        return self._process.state() != QProcess.NotRunning
+
+    def cancel(self) -> None:
+        """Kill the command if it's running, its outcome is ignored."""
+        self._timer.stop()
+        if self.is_running():
+            # Disconnected so that the outcome isn't reported.
+            self._process.finished.disconnect(self._on_process_finished)
+            self._process.errorOccurred.disconnect(self._on_process_error)
+            self._process.kill()
+            self._process.waitForFinished()
+            self._process.finished.connect(self._on_process_finished)
+            self._process.errorOccurred.connect(self._on_process_error)
+
+    @pyqtSlot(str)
+    def _start(self, passphrase: str) -> None:
+        if self.is_running():
+            return  # one attempt at a time, the device is already unlocking
+        self._failure = None
+        self._process.start(self._command[0], self._command[1:])
+        self._process.write((passphrase + "\n").encode())
+        self._process.closeWriteChannel()
+        self._timer.start()
+
+    @pyqtSlot(int, QProcess.ExitStatus)
+    def _on_process_finished(self, exit_code: int, exit_status: QProcess.ExitStatus) -> None:
+        self._timer.stop()
+        if exit_status == QProcess.NormalExit and exit_code == 0:
+            tracing.emit(self._device.unlocking_succeeded)
+            return
+        errors = bytes(self._process.readAllStandardError()).decode(errors="replace").strip()
+        self._fail(errors.splitlines()[-1] if errors else f"The unlock command exited with status {exit_code}.")
+
+    @pyqtSlot(QProcess.ProcessError)
+    def _on_process_error(self, error: QProcess.ProcessError) -> None:
+        # Crashes and kills are reported through finished.
+        if error == QProcess.FailedToStart:
+            self._timer.stop()
+            self._fail(f"The unlock command could not be started: {self._process.errorString()}")
+
+    @pyqtSlot()
+    def _on_timeout(self) -> None:
+        self.cancel()
+        self._fail("The unlock command timed out.")
+
+    @pyqtSlot(str)
+    def _on_device_state_changed(self, state: Device.State) -> None:
+        if state in (Device.MissingState, Device.RemovedState):
+            self.cancel()
+
+    def _fail(self, reason: str) -> None:
+        self._failure = reason
+        tracing.emit(self._device.unlocking_failed)
@@ -1,2 +1,10 @@
+from .fan_out import FanOutService
 from .service import Service
-from .simulator import Simulator
+
+
+def __getattr__(name: str):
+    # The simulator is made of widgets, only import them when it's used.
+    if name == "Simulator":
+        from .simulator import Simulator
+        return Simulator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,103 @@
+import collections
+import hashlib
+from typing import TYPE_CHECKING, BinaryIO, Callable, NewType, Optional
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+from .files import Entry
+
+# These formats are part of the API of the export service.
+Format = NewType("Format", str)
+Tar = Format("tar")
+CompressedTar = Format("tar.gz")
+
+# Compressed independently from each other, see Writer.
+BLOCK_SIZE = 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+
+class Writer:
+    """Streams files into a tar archive, without any temporary copy.
+
+    When an executor is provided, the archive is compressed: the tar stream
+    is cut into blocks that are compressed concurrently, each of them becoming
+    a gzip member of its own. A concatenation of gzip members is a valid gzip
+    file, the usual tools extract the archive as any other .tar.gz file.
+
+    A process pool executor is recommended, for compression not to compete
+    with the rest of the application for the GIL.
+    """
+
+    def __init__(self, sink: BinaryIO, executor: Optional["Executor"] = None, window: int = 4):
+        self._sink = sink
+        self._executor = executor
+        # How many blocks can be compressed concurrently.
+        self._window = window
+        self._block = bytearray()
+        self._pending = collections.deque()
+        self._position = 0
+        self._digest = hashlib.blake2b()
+
+    def add(self, entry: Entry, buffer: memoryview, on_chunk: Callable[[int], None]) -> None:
+        """Append a file to the archive, on_chunk is called with the size of each chunk."""
+        # Slow to import, and only needed by the exports that are archives.
+        # The format constants are used by the rest of the application at startup.
+        import tarfile
+        info = tarfile.TarInfo(entry.name)
+        info.size = entry.size
+        info.mtime = entry.mtime_ns // 1000000000
+        info.mode = 0o644
+        self._write(info.tobuf(tarfile.PAX_FORMAT))
+
+        remaining = entry.size
+        with open(entry.source, "rb", buffering=0) as source:
+            while remaining > 0:
+                size = source.readinto(buffer[:min(len(buffer), remaining)])
+                if not size:
+                    # The header is written already, the archive can't be fixed.
+                    raise OSError(f"{entry.name} was modified during the export.")
+                self._write(buffer[:size])
+                remaining -= size
+                on_chunk(size)
+        self._pad(tarfile.BLOCKSIZE)
+
+    def close(self) -> None:
+        """Write the end of the archive."""
+        import tarfile
+        self._write(bytes(2 * tarfile.BLOCKSIZE))
+        self._pad(tarfile.RECORDSIZE)
+        if self._block:
+            self._compress(bytes(self._block))
+            self._block.clear()
+        while self._pending:
+            self._output(self._pending.popleft().result())
+
+    def digest(self) -> bytes:
+        """The digest of the bytes written so far, for verification purposes."""
+        return self._digest.digest()
+
+    def _pad(self, size: int) -> None:
+        remainder = self._position % size
+        if remainder:
+            self._write(bytes(size - remainder))
+
+    def _write(self, data: bytes) -> None:
+        self._position += len(data)
+        if self._executor is None:
+            self._output(data)
+            return
+        self._block += data
+        while len(self._block) >= BLOCK_SIZE:
+            self._compress(bytes(self._block[:BLOCK_SIZE]))
+            del self._block[:BLOCK_SIZE]
+
+    def _compress(self, block: bytes) -> None:
+        import gzip
+        self._pending.append(self._executor.submit(gzip.compress, block, COMPRESSION_LEVEL))
+        while len(self._pending) > self._window:
+            self._output(self._pending.popleft().result())
+
+    def _output(self, data: bytes) -> None:
+        self._sink.write(data)
+        self._digest.update(data)
@@ -0,0 +1,96 @@
+import errno
+import os
+from typing import Callable, NewType
+
+# These backend names are reported by the export service for diagnostic purposes.
+Backend = NewType("Backend", str)
+CopyFileRange = Backend("copy_file_range")
+SendFile = Backend("sendfile")
+ReadInto = Backend("readinto")
+
+# Errors that mean "this backend can't copy between these two files",
+# as opposed to actual I/O errors.
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class SizeMismatch(OSError):
+    """The source didn't have the expected size, it changed during the copy."""
+
+    def __init__(self, size: int, copied: int):
+        super().__init__(f"{copied} bytes were copied instead of {size}.")
+        self.size = size
+        self.copied = copied
+
+
+def copy(source: int, sink: int, size: int, buffer: memoryview, on_chunk: Callable[[int], None]) -> Backend:
+    """Copy a file descriptor into another, and return the backend that was used.
+
+    The kernel copies the data when possible, without it going through Python.
+    The buffer is only used when that's not possible, its size determines
+    the size of the chunks in every case. on_chunk is called after each chunk
+    with its size, it can raise to interrupt the copy. The expected size
+    of the source helps detecting kernel calls that silently copy nothing,
+    SizeMismatch is raised if it's not what was copied in the end.
+    """
+    copied = 0
+
+    def counted(chunk: int) -> None:
+        nonlocal copied
+        copied += chunk
+        on_chunk(chunk)
+
+    backend = _copy(source, sink, size, buffer, counted)
+    # A file that shrinks makes every backend stop short without any error.
+    if copied != size:
+        raise SizeMismatch(size, copied)
+    return backend
+
+
+def _copy(source: int, sink: int, size: int, buffer: memoryview, on_chunk: Callable[[int], None]) -> Backend:
+    if hasattr(os, "copy_file_range"):
+        try:
+            _kernel_copy(lambda count: os.copy_file_range(source, sink, count), size, len(buffer), on_chunk)
+            return CopyFileRange
+        except _Unsupported:
+            pass
+    if hasattr(os, "sendfile"):
+        try:
+            _kernel_copy(lambda count: os.sendfile(sink, source, None, count), size, len(buffer), on_chunk)
+            return SendFile
+        except _Unsupported:
+            pass
+    _read_into(source, sink, buffer, on_chunk)
+    return ReadInto
+
+
+def _kernel_copy(call: Callable[[int], int], size: int, chunk_size: int, on_chunk: Callable[[int], None]) -> None:
+    first = True
+    while True:
+        try:
+            copied = call(chunk_size)
+        except OSError as error:
+            # Falling back is only safe as long as nothing was copied.
+            if first and error.errno in _UNSUPPORTED:
+                raise _Unsupported() from error
+            raise
+        if copied == 0:
+            if first and size > 0:
+                raise _Unsupported()  # e.g. some FUSE or special file systems
+            return
+        first = False
+        on_chunk(copied)
+
+
+def _read_into(source: int, sink: int, buffer: memoryview, on_chunk: Callable[[int], None]) -> None:
+    while True:
+        size = os.readv(source, [buffer])
+        if size == 0:
+            return
+        written = 0
+        while written < size:
+            written += os.write(sink, buffer[written:size])
+        on_chunk(size)
@@ -0,0 +1,75 @@
+import hashlib
+import os
+import re
+from typing import Optional
+
+from .files import Entry
+
+# File systems that store modification times with a 2 seconds resolution,
+# as they appear in /proc/mounts.
+COARSE_FILE_SYSTEMS = {"vfat", "msdos", "fat", "exfat"}
+MTIME_TOLERANCE_NS = 2 * 1000 * 1000 * 1000
+HASH_CHUNK_SIZE = 1024 * 1024
+MOUNTS = "/proc/mounts"
+
+
+def mtime_tolerance(destination: str) -> int:
+    """How far apart the modification times of identical files can be on a destination, in nanoseconds.
+
+    Modification times are compared exactly, except on file systems
+    that can't store them exactly (FAT).
+    """
+    return MTIME_TOLERANCE_NS if _file_system(destination) in COARSE_FILE_SYSTEMS else 0
+
+
+def unchanged(entry: Entry, target: str, tolerance_ns: int = 0) -> bool:
+    """Whether the device already has an identical copy of a file.
+
+    Sizes and modification times are compared first (see mtime_tolerance()).
+    When only the modification times differ, the contents are compared.
+    Nothing is written to the device, see refresh().
+    """
+    try:
+        stat = os.stat(target)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != entry.size:
+        return False
+    if abs(stat.st_mtime_ns - entry.mtime_ns) <= tolerance_ns:
+        return True
+    return _digest(entry.source) == _digest(target)
+
+
+def refresh(entry: Entry, target: str, tolerance_ns: int = 0) -> None:
+    """Give an unchanged copy the modification time of its source, so that the next comparison is a quick one."""
+    stat = os.stat(target)
+    if abs(stat.st_mtime_ns - entry.mtime_ns) > tolerance_ns:
+        os.utime(target, ns=(stat.st_atime_ns, entry.mtime_ns))
+
+
+def _file_system(path: str) -> Optional[str]:
+    """The type of the file system a path is on, as per the longest mount point it's under."""
+    path = os.path.realpath(path)
+    file_system = None
+    longest = -1
+    try:
+        with open(MOUNTS) as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces and such are escaped as octal sequences, e.g. \040.
+                mount_point = re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), fields[1])
+                if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > longest:
+                    file_system, longest = fields[2], len(mount_point)
+    except OSError:
+        return None  # not Linux, modification times are compared exactly
+    return file_system
+
+
+def _digest(path: str) -> bytes:
+    digest = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
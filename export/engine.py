@@ -0,0 +1,485 @@
+import itertools
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from PyQt5.QtCore import *
+
+from . import backends, delta, verification
+from .files import Entry, entries
+from .journal import Journal
+
+if TYPE_CHECKING:
+    from . import archive
+
+# Big enough to keep USB devices busy, small enough to report progress often.
+CHUNK_SIZE = 1024 * 1024
+# Upper bound of the data read but not yet written, across all workers.
+IN_FLIGHT_BYTES = 16 * CHUNK_SIZE
+# How much data is written between two entries in the journal.
+CHECKPOINT_BYTES = 64 * CHUNK_SIZE
+# How often progress is reported, in seconds. Reporting every chunk would
+# flood the event loop of the receiving thread.
+PROGRESS_INTERVAL = 0.05
+
+
+class Cancelled(Exception):
+    """Raised from within the engine when the export was cancelled."""
+
+
+class _BufferPool:
+    """Caps the number of bytes that the workers hold in memory at any time.
+
+    Workers take a buffer from the pool for each file they copy, and wait
+    when every buffer is taken. Buffers are allocated as they're first needed,
+    there are never more of them than the pool was created for.
+    """
+    def __init__(self, count: int, size: int):
+        self._count = count
+        self._size = size
+        self._free = []
+        self.allocated = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> memoryview:
+        with self._condition:
+            while not self._free and self.allocated == self._count:
+                self._condition.wait()
+            if self._free:
+                return self._free.pop()
+            self.allocated += 1
+        return memoryview(bytearray(self._size))
+
+    def release(self, buffer: memoryview) -> None:
+        with self._condition:
+            self._free.append(buffer)
+            self._condition.notify()
+
+
+class _Checkpoint:
+    """Syncs a file being exported and records it in the journal every so often."""
+    def __init__(self, journal: Journal, entry: Entry, fd: int, offset: int):
+        self._journal = journal
+        self._entry = entry
+        self._fd = fd
+        self._offset = offset
+        self._pending = 0
+
+    def advance(self, size: int) -> None:
+        self._offset += size
+        self._pending += size
+        if self._pending >= CHECKPOINT_BYTES:
+            self.commit()
+
+    def commit(self) -> None:
+        # Each worker syncs its own file, without holding the journal.
+        os.fsync(self._fd)
+        self._journal.checkpoint(self._entry, self._offset)
+        self._pending = 0
+
+
+class Engine(QObject):
+    """Copies files to a destination directory, in chunks.
+
+    The engine does blocking I/O, it is meant to be moved to a QThread
+    and driven through queued signals (see export.Service).
+    Its signals are emitted from that thread, or from its workers.
+    Each of them carries the identifier of the run (or plan) it's about,
+    as given by the caller: a cancelled run may still report after
+    the next one started.
+
+    Files are copied concurrently by a pool of workers, one file per worker,
+    which helps when the export is made of many small files.
+    Each file is copied by the kernel when possible (see export.backends).
+
+    Progress is recorded in a journal on the destination (see export.journal),
+    exporting the same files again after a failure resumes from there.
+
+    In incremental mode, files that the destination already has
+    are skipped (see export.delta).
+
+    When verification is enabled, each copy is read back from the destination
+    and compared with its source (see export.verification).
+
+    In archive mode, the files are streamed into a single archive instead
+    (see export.archive), which suits file systems that are slow to create
+    many small files. Exports can't be resumed or incremental in that mode.
+
+    The same files can also be exported to several destinations at once,
+    reading them only once (see fan_out()).
+    """
+
+    # The first argument of every signal is the identifier of a run, or of a plan.
+    failed = pyqtSignal(int, str)
+    succeeded = pyqtSignal(int)
+    file_exported = pyqtSignal(int, str)
+    progressed = pyqtSignal(int, "qint64", "qint64")
+    # For diagnostic purposes: the name of a file, and the backend used to copy it.
+    backend_selected = pyqtSignal(int, str, str)
+    # The files and bytes to transfer, out of the total files and bytes.
+    planned = pyqtSignal(int, int, "qint64", int, "qint64")
+    # Why the export couldn't be planned.
+    planning_failed = pyqtSignal(int, str)
+    # A destination of a fan-out export that was dropped, and why.
+    target_failed = pyqtSignal(int, str, str)
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, workers: int = 1, in_flight_bytes: int = IN_FLIGHT_BYTES):
+        super().__init__()
+        self._chunk_size = chunk_size
+        self._workers = workers
+        self._in_flight_bytes = in_flight_bytes
+        self._incremental = False
+        self._verification = False
+        self._archive = None
+        self._run_id = 0
+        # Set from any thread, checked between chunks.
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        # Shared by the workers, see _BufferPool.
+        self._buffers = None
+        # Destinations of a fan-out export that were dropped, and why.
+        self._dropped_targets = {}
+        self._cancelled_targets = {}
+        self._tolerances = {}
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def set_workers(self, count: int) -> None:
+        """Set how many files are copied concurrently. Not to be called during an export."""
+        self._workers = max(1, count)
+
+    def set_in_flight_bytes(self, size: int) -> None:
+        """Set how much data the workers may hold in memory at once, in whole chunks. Not to be called during an export."""
+        self._in_flight_bytes = size
+
+    def set_incremental(self, incremental: bool) -> None:
+        """Set whether files that the destination already has are skipped. Not to be called during an export."""
+        self._incremental = incremental
+
+    def set_verification(self, verification: bool) -> None:
+        """Set whether copies are verified. Not to be called during an export."""
+        self._verification = verification
+
+    def set_archive(self, format: Optional["archive.Format"]) -> None:
+        """Set the format of the archive to export the files into, or None. Not to be called during an export."""
+        self._archive = format
+
+    @pyqtSlot(int, list, str)
+    def plan(self, plan_id: int, paths: List[str], destination: str) -> None:
+        """Find out how much data an export would transfer."""
+        try:
+            files = entries(paths)
+            self._tolerances = {}
+            transferred = [entry for entry in files if not self._skipped(entry, destination)]
+        except Exception as error:
+            self.planning_failed.emit(plan_id, str(error) or type(error).__name__)
+            return
+        self.planned.emit(plan_id, len(transferred), sum(entry.size for entry in transferred), len(files), sum(entry.size for entry in files))
+
+    @pyqtSlot(int, list, str)
+    def run(self, run_id: int, paths: List[str], destination: str) -> None:
+        self._export(run_id, paths, self._copy_all if self._archive is None else self._archive_all, destination)
+
+    @pyqtSlot(int, list, list)
+    def fan_out(self, run_id: int, paths: List[str], destinations: List[str]) -> None:
+        """Export the same files to several destinations, reading them once.
+
+        A destination that fails is reported (see target_failed) and dropped,
+        the export goes on with the others. It only fails as a whole when
+        every destination failed. Files are exported one at a time, and
+        fan-out exports can't be resumed (the journal isn't used),
+        nor be archives. Incremental mode and verification apply
+        to each destination independently.
+        """
+        with self._lock:
+            self._cancelled_targets = {}
+        self._export(run_id, paths, self._fan_out_all, destinations)
+
+    def cancel_target(self, destination: str, reason: str) -> None:
+        """Stop exporting to one of the destinations of a fan-out export, from any thread."""
+        with self._lock:
+            self._cancelled_targets.setdefault(destination, reason)
+
+    def _export(self, run_id: int, paths: List[str], export, destination) -> None:
+        self._run_id = run_id
+        self._cancelled.clear()
+        self._tolerances = {}  # of modification times, by destination
+        try:
+            files = entries(paths)
+            self._total = sum(entry.size for entry in files)
+            self._written = 0
+            self._reported_at = time.monotonic()
+            self.progressed.emit(self._run_id, self._written, self._total)
+            export(files, destination)
+        except Cancelled:
+            self.failed.emit(self._run_id, "The export was cancelled.")
+        except Exception as error:
+            # Whatever went wrong (I/O errors, mismatches, a broken compressor process...),
+            # it must not escape the slot: PyQt would abort the whole application.
+            self.failed.emit(self._run_id, str(error) or type(error).__name__)
+        else:
+            self.succeeded.emit(self._run_id)
+
+    def _copy_all(self, files: List[Entry], destination: str) -> None:
+        # Imported on first use, so that importing the export package stays cheap.
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        self._journal = Journal(destination)
+        try:
+            # At least one chunk, whatever the budget.
+            self._buffers = _BufferPool(max(1, self._in_flight_bytes // self._chunk_size), self._chunk_size)
+            with ThreadPoolExecutor(self._workers) as pool, ThreadPoolExecutor(self._workers) as hashers:
+                self._hashers = hashers
+                futures = [pool.submit(self._copy, entry, destination) for entry in files]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except BaseException:
+                    # One failure fails the whole export, the files
+                    # that aren't being copied yet aren't copied at all.
+                    self._cancelled.set()
+                    pool.shutdown(cancel_futures=True)
+                    hashers.shutdown(cancel_futures=True)
+                    raise
+        except BaseException:
+            # Kept for the next export to resume from.
+            self._journal.close()
+            raise
+        finally:
+            self._buffers = None  # only held during the export
+        # Every file was copied, otherwise its future would have raised.
+        self._journal.discard()
+
+    def _archive_all(self, files: List[Entry], destination: str) -> None:
+        from . import archive
+        target = None
+        # Spawned processes don't inherit the state of the GUI process,
+        # they import the main module again (its code must be guarded, see main.py).
+        compressors = None
+        processes = os.cpu_count() or 1
+        if self._archive == archive.CompressedTar:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            compressors = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            target, fd = _create_unique(destination, time.strftime("export-%Y%m%d-%H%M%S"), "." + self._archive)
+            with open(fd, "wb") as sink:
+                writer = archive.Writer(sink, compressors, window=2 * processes)
+                buffer = memoryview(bytearray(self._chunk_size))  # files are added one at a time
+                for entry in files:
+                    if self._cancelled.is_set():
+                        raise Cancelled()  # empty files don't report any chunk
+                    writer.add(entry, buffer, self._on_chunk)
+                    self.file_exported.emit(self._run_id, entry.name)
+                writer.close()
+                sink.flush()
+                os.fsync(sink.fileno())
+            if self._verification and writer.digest() != verification.read_back(target):
+                raise verification.Mismatch(f"The archive {os.path.basename(target)} doesn't match what was written.")
+        except BaseException:
+            # A partial archive is of no use. Whatever was there before isn't ours to remove.
+            if target is not None and os.path.exists(target):
+                os.remove(target)
+            raise
+        finally:
+            if compressors is not None:
+                compressors.shutdown(cancel_futures=True)
+
+    def _fan_out_all(self, files: List[Entry], destinations: List[str]) -> None:
+        if self._archive is not None:
+            raise OSError("Archives can't be exported to several devices at once.")
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._dropped_targets = {}
+        # Each destination has its own writer thread, so that a slow device
+        # only slows down the others by as much as it's slower than them.
+        with ThreadPoolExecutor(len(destinations)) as writers:
+            buffers = [memoryview(bytearray(self._chunk_size)) for _ in range(2)]
+            for entry in files:
+                if self._cancelled.is_set():
+                    raise Cancelled()  # skipped and empty files don't read any chunk
+                self._drop_cancelled_targets(destinations)
+                if len(self._dropped_targets) == len(destinations):
+                    raise OSError("The export failed on every USB device.")
+                self._fan_out(entry, [destination for destination in destinations if destination not in self._dropped_targets], writers, buffers)
+        if len(self._dropped_targets) == len(destinations):
+            raise OSError("The export failed on every USB device.")
+
+    def _fan_out(self, entry: Entry, destinations: List[str], writers, buffers: List[memoryview]) -> None:
+        sinks = {}
+        writes = []
+        read = 0
+        try:
+            for destination in destinations:
+                target = os.path.join(destination, entry.name)
+                try:
+                    if self._skipped(entry, destination):
+                        delta.refresh(entry, target, self._tolerances[destination])
+                        continue
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    sinks[destination] = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                except OSError as error:
+                    self._drop_target(destination, str(error))
+
+            # The source is read once, into one buffer while the previous chunk
+            # is being written from the other one to every destination.
+            digest = verification.new_digest() if self._verification else None
+            with open(entry.source, "rb", buffering=0) as source:
+                while sinks:
+                    size = os.readv(source.fileno(), [buffers[0]])
+                    chunk = buffers[0][:size]
+                    if digest is not None:
+                        digest.update(chunk)
+                    self._wait_for_writes(writes, sinks)
+                    self._drop_cancelled_targets(sinks, sinks)
+                    if self._cancelled.is_set():
+                        raise Cancelled()
+                    if size == 0:
+                        break
+                    writes = [(destination, writers.submit(_write, fd, chunk)) for destination, fd in sinks.items()]
+                    buffers.reverse()
+                    read += size
+                    self._progress(size)
+            if sinks and read != entry.size:
+                # Every copy would be truncated the same way.
+                raise OSError(f"{entry.name} was modified during the export.")
+
+            writes = [(destination, writers.submit(os.fsync, fd)) for destination, fd in sinks.items()]
+            self._wait_for_writes(writes, sinks)
+            for destination in list(sinks):
+                target = os.path.join(destination, entry.name)
+                os.close(sinks.pop(destination))
+                os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+                if digest is not None and digest.digest() != verification.read_back(target):
+                    self._drop_target(destination, f"The copy of {entry.name} doesn't match the original file.")
+        finally:
+            # The writers may still be using the file descriptors.
+            for _, future in writes:
+                future.exception()
+            for fd in sinks.values():
+                os.close(fd)
+        if read < entry.size:
+            self._progress(entry.size - read)  # skipped, or every destination failed
+        self.file_exported.emit(self._run_id, entry.name)
+
+    def _wait_for_writes(self, writes: list, sinks: dict) -> None:
+        for destination, future in writes:
+            try:
+                future.result()
+            except OSError as error:
+                os.close(sinks.pop(destination))
+                self._drop_target(destination, str(error))
+
+    def _drop_cancelled_targets(self, destinations, sinks: Optional[dict] = None) -> None:
+        with self._lock:
+            cancelled = [(destination, self._cancelled_targets[destination]) for destination in destinations if destination in self._cancelled_targets]
+        for destination, reason in cancelled:
+            if destination in self._dropped_targets:
+                continue
+            if sinks is not None and destination in sinks:
+                os.close(sinks.pop(destination))
+            self._drop_target(destination, reason)
+
+    def _drop_target(self, destination: str, reason: str) -> None:
+        self._dropped_targets[destination] = reason
+        self.target_failed.emit(self._run_id, destination, reason)
+
+    def _copy(self, entry: Entry, destination: str) -> None:
+        if self._cancelled.is_set():
+            # The export failed or was cancelled meanwhile, don't touch the device.
+            # Raising rather than returning keeps the file from counting as exported.
+            raise Cancelled()
+        target = os.path.join(destination, entry.name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        offset = self._journal.offset(entry, target)
+        if not offset and self._skipped(entry, destination):
+            delta.refresh(entry, target, self._tolerances[destination])
+            offset = entry.size  # the destination has it already
+        if offset:
+            self._progress(offset)
+        if offset and offset == entry.size:
+            self.file_exported.emit(self._run_id, entry.name)
+            return  # nothing left to copy
+
+        hasher = None
+        if self._verification:
+            hasher = verification.ChunkHasher(self._hashers, entry.source)
+            hasher.update(offset)
+
+        # Kernel copies don't need the buffer, but taking it anyway
+        # keeps the bound simple: one chunk per file being copied.
+        buffer = self._buffers.acquire()
+        try:
+            with open(entry.source, "rb", buffering=0) as source, open(target, "r+b" if offset else "wb", buffering=0) as sink:
+                if offset:
+                    sink.truncate(offset)
+                    source.seek(offset)
+                    sink.seek(offset)
+                checkpoint = _Checkpoint(self._journal, entry, sink.fileno(), offset)
+
+                def on_chunk(size: int) -> None:
+                    self._on_chunk(size)
+                    if hasher is not None:
+                        hasher.update(size)
+                    checkpoint.advance(size)
+
+                try:
+                    backend = backends.copy(source.fileno(), sink.fileno(), entry.size - offset, buffer, on_chunk)
+                except backends.SizeMismatch:
+                    raise OSError(f"{entry.name} was modified during the export.") from None
+                checkpoint.commit()
+            # Keeping the modification time allows incremental exports.
+            os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+        except BaseException:
+            if hasher is not None:
+                hasher.cancel()
+            raise
+        finally:
+            self._buffers.release(buffer)
+
+        if hasher is not None and hasher.digest() != verification.read_back(target):
+            self._journal.checkpoint(entry, 0)  # so that retrying doesn't skip it
+            raise verification.Mismatch(f"The copy of {entry.name} doesn't match the original file.")
+        self.backend_selected.emit(self._run_id, entry.name, backend)
+        self.file_exported.emit(self._run_id, entry.name)
+
+    def _skipped(self, entry: Entry, destination: str) -> bool:
+        if not self._incremental or self._archive is not None:
+            return False
+        tolerance = self._tolerances.get(destination)
+        if tolerance is None:
+            tolerance = self._tolerances[destination] = delta.mtime_tolerance(destination)
+        return delta.unchanged(entry, os.path.join(destination, entry.name), tolerance)
+
+    def _on_chunk(self, size: int) -> None:
+        if self._cancelled.is_set():
+            raise Cancelled()
+        self._progress(size)
+
+    def _progress(self, size: int) -> None:
+        with self._lock:
+            self._written += size
+            written = self._written
+            now = time.monotonic()
+            if now - self._reported_at < PROGRESS_INTERVAL and written < self._total:
+                return
+            self._reported_at = now
+        self.progressed.emit(self._run_id, written, self._total)
+
+
+def _create_unique(directory: str, stem: str, extension: str) -> Tuple[str, int]:
+    """Create a file that didn't exist, adding a suffix to its name as needed."""
+    suffix = ""
+    for attempt in itertools.count(1):
+        path = os.path.join(directory, stem + suffix + extension)
+        try:
+            return path, os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            suffix = f"-{attempt}"
+
+
+def _write(fd: int, data: memoryview) -> None:
+    while data:
+        data = data[os.write(fd, data):]
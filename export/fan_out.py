@@ -0,0 +1,161 @@
+from typing import List, Optional
+
+from PyQt5.QtCore import *
+
+from device import Device, Registry
+import tracing
+from .engine import Engine
+
+
+class FanOutService(QObject):
+    """Exports the same files to every unlocked device of a registry at once.
+
+    Each source file is read once, and written to all the devices concurrently
+    (see Engine.fan_out). A device that fails, or that is locked or removed
+    during the export, is reported through device_failed, and the export
+    goes on with the others. The export only fails when every device failed.
+    """
+
+    # These signals are part of the service public API,
+    # along with the public methods. See also export.Service.
+    failed = pyqtSignal()
+    succeeded = pyqtSignal()
+    started = pyqtSignal()
+    finished = pyqtSignal()
+    file_exported = pyqtSignal(str)
+    progressed = pyqtSignal("qint64", "qint64")
+    # The identifier of a device that was dropped from the export, and why.
+    device_failed = pyqtSignal(str, str)
+
+    # Queued to the engine, which lives in its own thread.
+    # Runs are numbered, see Engine.
+    _run = pyqtSignal(int, list, list)
+
+    def __init__(self, registry: Registry):
+        super().__init__()
+
+        self._registry = registry
+        self._files = []
+        self._targets = {}  # mount points of the devices being exported to, by identifier
+        self._running = False
+        self._failure = None
+        # What the engine reports about earlier runs is ignored.
+        self._run_id = 0
+
+        self._registry.state_changed.connect(self._on_device_state_changed)
+        self._registry.removed.connect(self._on_device_removed)
+
+        self.failed.connect(self._on_done)
+        self.succeeded.connect(self._on_done)
+
+        self._thread = QThread()
+        self._engine = Engine()
+        self._engine.moveToThread(self._thread)
+        self._run.connect(self._engine.fan_out)
+        self._engine.succeeded.connect(self._on_engine_succeeded)
+        self._engine.failed.connect(self._on_engine_failed)
+        self._engine.file_exported.connect(self._on_engine_file_exported)
+        self._engine.progressed.connect(self._on_engine_progressed)
+        self._engine.target_failed.connect(self._on_engine_target_failed)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._stop_thread)
+
+    @property
+    def failure(self) -> Optional[str]:
+        """Why the last export failed, when known."""
+        return self._failure
+
+    @property
+    def targets(self) -> List[str]:
+        """The identifiers of the devices the export was started with."""
+        return list(self._targets)
+
+    def set_files(self, paths: List[str]) -> None:
+        """Select the files (or directories) to export."""
+        self._files = list(paths)
+
+    def set_verification(self, verification: bool) -> None:
+        """Set whether the exported files are read back and compared with the originals (they aren't by default)."""
+        if not self._running:
+            self._engine.set_verification(verification)
+
+    def set_incremental(self, incremental: bool) -> None:
+        """Set whether files that are already on a device are skipped for that device (they aren't by default)."""
+        if not self._running:
+            self._engine.set_incremental(incremental)
+
+    def start(self) -> None:
+        """Export the files to every device that is unlocked at this point."""
+        self._failure = None
+        self._targets = self._registry.mount_points()
+        tracing.emit(self.started)
+        if not self._targets:
+            self._failure = "No USB device is unlocked."
+            tracing.emit(self.failed)
+            return
+
+        self._running = True
+        self._thread.start()
+        self._run_id += 1
+        self._run.emit(self._run_id, self._files, list(self._targets.values()))
+
+    def cancel(self) -> None:
+        if self._running:
+            self._running = False
+            self._engine.cancel()
+            self._failure = "The export was cancelled."
+            tracing.emit(self.failed)
+
+    def _on_device_state_changed(self, id: str, state: Device.State) -> None:
+        if self._running and id in self._targets and state != Device.UnlockedState:
+            self._engine.cancel_target(self._targets[id], "The USB device was locked or removed.")
+
+    def _on_device_removed(self, id: str) -> None:
+        self._on_device_state_changed(id, Device.RemovedState)
+
+    def _is_current(self, run_id: int) -> bool:
+        # A cancelled run may still report, possibly once the next one started.
+        return self._running and run_id == self._run_id
+
+    @pyqtSlot(int)
+    def _on_engine_succeeded(self, run_id: int) -> None:
+        if self._is_current(run_id):
+            self._running = False
+            tracing.emit(self.succeeded)
+
+    @pyqtSlot(int, str)
+    def _on_engine_failed(self, run_id: int, reason: str) -> None:
+        if self._is_current(run_id):
+            self._running = False
+            self._failure = reason
+            tracing.emit(self.failed)
+
+    @pyqtSlot(int, str)
+    def _on_engine_file_exported(self, run_id: int, name: str) -> None:
+        if self._is_current(run_id):
+            tracing.emit(self.file_exported, name)
+
+    @pyqtSlot(int, "qint64", "qint64")
+    def _on_engine_progressed(self, run_id: int, written: int, total: int) -> None:
+        if self._is_current(run_id):
+            tracing.emit(self.progressed, written, total)
+
+    @pyqtSlot(int, str, str)
+    def _on_engine_target_failed(self, run_id: int, destination: str, reason: str) -> None:
+        if run_id != self._run_id:
+            return
+        for id, mount_point in self._targets.items():
+            if mount_point == destination:
+                tracing.emit(self.device_failed, id, reason)
+
+    @pyqtSlot()
+    def _on_done(self) -> None:
+        tracing.emit(self.finished)
+
+    @pyqtSlot()
+    def _stop_thread(self) -> None:
+        self._engine.cancel()
+        self._thread.quit()
+        self._thread.wait()
@@ -0,0 +1,54 @@
+import os
+from typing import Iterator, List, NamedTuple, Tuple
+
+
+class Entry(NamedTuple):
+    """A file to export, and its path relative to the destination."""
+    source: str
+    name: str
+    size: int
+    mtime_ns: int
+
+
+def entries(paths: List[str]) -> List[Entry]:
+    """List the files to export.
+
+    Directories are walked recursively, their contents keep their
+    relative layout on the destination.
+    """
+    return [_entry(source, name) for source, name in walk(paths)]
+
+
+def walk(paths: List[str], sort: bool = True) -> Iterator[Tuple[str, str]]:
+    """Iterate lazily over the files to export, see entries().
+
+    Yields the path of each file and its path relative to the destination,
+    without calling stat on them. Sorting a directory requires reading it
+    in full first. Unsorted, files are yielded as they're read, in the order
+    of the file system, so that the first ones of a huge directory come fast.
+    """
+    for path in paths:
+        path = os.path.abspath(path)
+        parent = os.path.dirname(path)
+        if not os.path.isdir(path):
+            yield path, os.path.basename(path)
+            continue
+        # Depth first, each directory's files before its subdirectories, as os.walk does.
+        pending = [path]
+        while pending:
+            directories = []
+            try:
+                with os.scandir(pending.pop()) as scan:
+                    for entry in sorted(scan, key=lambda entry: entry.name) if sort else scan:
+                        if not entry.is_dir():
+                            yield entry.path, os.path.relpath(entry.path, parent)
+                        elif not entry.is_symlink():
+                            directories.append(entry.path)
+            except OSError:
+                pass  # what can't be read is left out, as os.walk does
+            pending.extend(reversed(directories))
+
+
+def _entry(source: str, name: str) -> Entry:
+    stat = os.stat(source)
+    return Entry(source, name, stat.st_size, stat.st_mtime_ns)
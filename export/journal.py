@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+from .files import Entry
+
+FILENAME = ".wizard-export-journal"
+# How often the journal is synced, in seconds. Syncing it after every file
+# would serialize the workers on it, losing the last second of records
+# only means resuming from a little earlier.
+SYNC_INTERVAL = 1.0
+
+
+class Journal:
+    """Keeps track, on the device itself, of what was durably written.
+
+    The journal is a JSON lines file at the root of the destination.
+    Each line records how many bytes of a file were written and synced,
+    along with the size and modification time of its source, so that
+    a later export of the same files can resume where this one stopped.
+    The last line for a given file wins, a truncated line (e.g. because
+    the device was yanked) is ignored.
+
+    Records are only written once the data they describe was synced,
+    the journal itself is synced every SYNC_INTERVAL, and when closed.
+
+    The journal is discarded once an export succeeds.
+    """
+
+    def __init__(self, destination: str):
+        self._path = os.path.join(destination, FILENAME)
+        self._records = {}
+        self._lock = threading.Lock()
+        self._load()
+        self._file = open(self._path, "a")
+        self._synced_at = time.monotonic()
+
+    def offset(self, entry: Entry, target: str) -> int:
+        """How many bytes of a file can be trusted to be on the device already."""
+        record = self._records.get(entry.name)
+        if record is None or record["size"] != entry.size or record["mtime_ns"] != entry.mtime_ns:
+            return 0
+        try:
+            if os.path.getsize(target) < record["offset"]:
+                return 0
+        except OSError:
+            return 0
+        return record["offset"]
+
+    def checkpoint(self, entry: Entry, offset: int) -> None:
+        """Record that the first bytes of a file were durably written."""
+        record = {"name": entry.name, "size": entry.size, "mtime_ns": entry.mtime_ns, "offset": offset}
+        with self._lock:
+            self._records[entry.name] = record
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            now = time.monotonic()
+            sync = now - self._synced_at >= SYNC_INTERVAL
+            if sync:
+                self._synced_at = now
+        # Other workers can record their own progress meanwhile.
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Sync and close the journal, e.g. after a failure, for the next export to resume."""
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            pass  # e.g. the device was yanked, what was synced before is still there
+        self._file.close()
+
+    def discard(self) -> None:
+        self._file.close()  # no need to sync what's removed
+        os.remove(self._path)
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                        self._records[record["name"]] = record
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from typing import List, NamedTuple
+
+from PyQt5.QtCore import *
+
+# How often partial totals are reported, in seconds.
+REPORT_INTERVAL = 0.1
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class _Directory(NamedTuple):
+    """What a scan found in a directory, not counting its subdirectories."""
+    mtime_ns: int
+    files: int
+    size: int
+    directories: List[str]
+
+
+class Scanner(QObject):
+    """Counts the files of a selection, and their total size.
+
+    The scanner does blocking I/O, it is meant to be moved to a QThread
+    and driven through queued signals (see export.Service).
+
+    Directories are cached by modification time, which changes whenever
+    files are added, removed or renamed in them. Scanning an unchanged tree
+    again only requires one stat per directory. (Files modified in place
+    don't change the modification time of their directory, their size
+    is only updated once their directory is read again.)
+    """
+
+    # Partial totals while the scan is in progress, then the final ones:
+    # the number of files, and their total size.
+    progressed = pyqtSignal(int, "qint64")
+    scanned = pyqtSignal(int, "qint64")
+
+    def __init__(self):
+        super().__init__()
+        self._cache = {}
+        # Set from any thread, checked between directories and selected files.
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @pyqtSlot(list)
+    def scan(self, paths: List[str]) -> None:
+        self._cancelled.clear()
+        self._files = 0
+        self._size = 0
+        self._reported_at = time.monotonic()
+        try:
+            for path in paths:
+                path = os.path.abspath(path)
+                if os.path.isdir(path):
+                    self._scan_tree(path)
+                    continue
+                # Selections of many files need the same care as large trees.
+                self._check_cancelled()
+                try:
+                    self._size += os.stat(path).st_size
+                    self._files += 1
+                except OSError:
+                    continue
+                self._report()
+        except _Cancelled:
+            return
+        self.scanned.emit(self._files, self._size)
+
+    def _scan_tree(self, path: str) -> None:
+        pending = [path]
+        while pending:
+            self._check_cancelled()
+            directory = pending.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+                cached = self._cache.get(directory)
+                if cached is None or cached.mtime_ns != mtime_ns:
+                    cached = self._read(directory, mtime_ns)
+                    self._cache[directory] = cached
+            except OSError:
+                continue  # the export will report it, if it's still a problem by then
+            self._files += cached.files
+            self._size += cached.size
+            pending.extend(cached.directories)
+            self._report()
+
+    def _check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise _Cancelled()
+
+    def _report(self) -> None:
+        now = time.monotonic()
+        if now - self._reported_at >= REPORT_INTERVAL:
+            self._reported_at = now
+            self.progressed.emit(self._files, self._size)
+
+    def _read(self, directory: str, mtime_ns: int) -> _Directory:
+        files = 0
+        size = 0
+        directories = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file():
+                    files += 1
+                    size += entry.stat().st_size
+        return _Directory(mtime_ns, files, size, directories)
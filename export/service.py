@@ -1,10 +1,12 @@
-from typing import NewType
+from typing import List, NewType, Optional, Tuple
 
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
-from PyQt5.QtWidgets import *
 
 from device import Device
+import tracing
+from . import archive
+from .engine import Engine
+from .scanner import Scanner
 
 class Service(QObject):
 
@@ -14,28 +16,226 @@ class Service(QObject):
     succeeded = pyqtSignal()
     started = pyqtSignal()
     finished = pyqtSignal()
+    # Progress: the name of each exported file,
+    # and the number of bytes written out of the total.
+    file_exported = pyqtSignal(str)
+    progressed = pyqtSignal("qint64", "qint64")
+    # Diagnostics: the name of each exported file, and how it was copied.
+    backend_selected = pyqtSignal(str, str)
+    # Before the export: the files and bytes that it would transfer,
+    # out of the total files and bytes selected.
+    planned = pyqtSignal(int, "qint64", int, "qint64")
+    # Why the export couldn't be planned, e.g. a file can't be read.
+    planning_failed = pyqtSignal(str)
+    # The number of files selected, and their total size.
+    # Partial totals are reported while the selection is being scanned.
+    scan_progressed = pyqtSignal(int, "qint64")
+    scanned = pyqtSignal(int, "qint64")
+
+    # Queued to the engine and the scanner, which live in their own threads.
+    # Runs and plans are numbered, see Engine.
+    _plan = pyqtSignal(int, list, str)
+    _run = pyqtSignal(int, list, str)
+    _scan = pyqtSignal(list)
 
     def __init__(self, device: Device):
         super().__init__()
 
         self._device = device
+        self._files = []
+        self._running = False
+        self._failure = None
+        self._totals = None
+        self._archive = None
+        # What the engine reports about earlier runs and plans is ignored.
+        self._run_id = 0
+        self._plan_id = 0
 
         self._device.state_changed.connect(self._on_device_state_changed)
 
-        self.failed.connect(self.finished)
-        self.succeeded.connect(self.finished)
+        self.failed.connect(self._on_done)
+        self.succeeded.connect(self._on_done)
+
+        # The copy happens off the GUI thread, so that the event loop
+        # never waits on the USB device.
+        self._thread = QThread()
+        self._engine = Engine()
+        self._engine.moveToThread(self._thread)
+        self._plan.connect(self._engine.plan)
+        self._run.connect(self._engine.run)
+        self._engine.planned.connect(self._on_engine_planned)
+        self._engine.planning_failed.connect(self._on_engine_planning_failed)
+        self._engine.succeeded.connect(self._on_engine_succeeded)
+        self._engine.failed.connect(self._on_engine_failed)
+        self._engine.file_exported.connect(self._on_engine_file_exported)
+        self._engine.progressed.connect(self._on_engine_progressed)
+        self._engine.backend_selected.connect(self._on_engine_backend_selected)
+
+        self._scanner_thread = QThread()
+        self._scanner = Scanner()
+        self._scanner.moveToThread(self._scanner_thread)
+        self._scan.connect(self._scanner.scan)
+        self._scanner.progressed.connect(self._on_scanner_progressed)
+        self._scanner.scanned.connect(self._on_scanner_scanned)
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._stop_threads)
+
+    @property
+    def failure(self) -> Optional[str]:
+        """Why the last export failed, when known."""
+        return self._failure
+
+    @property
+    def files(self) -> List[str]:
+        """The files (or directories) selected for export."""
+        return list(self._files)
+
+    @property
+    def archive_format(self) -> Optional[archive.Format]:
+        """The format of the archive the files are exported into, or None."""
+        return self._archive
+
+    @property
+    def totals(self) -> Optional[Tuple[int, int]]:
+        """The number of files selected and their total size, once scanned."""
+        return self._totals
+
+    def set_files(self, paths: List[str]) -> None:
+        """Select the files (or directories) to export."""
+        self._files = list(paths)
+
+    def set_workers(self, count: int) -> None:
+        """Set how many files are copied concurrently (one by default)."""
+        if not self._running:
+            self._engine.set_workers(count)
+
+    def set_in_flight_bytes(self, size: int) -> None:
+        """Set how much data the workers may hold in memory at once (see export.engine.IN_FLIGHT_BYTES by default)."""
+        if not self._running:
+            self._engine.set_in_flight_bytes(size)
+
+    def set_incremental(self, incremental: bool) -> None:
+        """Set whether files that are already on the device are skipped (they aren't by default)."""
+        if not self._running:
+            self._engine.set_incremental(incremental)
+
+    def set_verification(self, verification: bool) -> None:
+        """Set whether the exported files are read back and compared with the originals (they aren't by default)."""
+        if not self._running:
+            self._engine.set_verification(verification)
+
+    def set_archive(self, format: Optional[archive.Format]) -> None:
+        """Export the files into a single archive (see export.archive), or not (by default)."""
+        if not self._running:
+            self._archive = format
+            self._engine.set_archive(format)
+
+    def scan(self) -> None:
+        """Count the selected files and their total size, see the scanned signal."""
+        self._scanner.cancel()  # a previous scan would be outdated
+        self._totals = None
+        self._scanner_thread.start()
+        self._scan.emit(self._files)
+
+    def plan(self) -> None:
+        """Find out how much data the export would transfer, see the planned signal."""
+        if not self._files or self._device.state != Device.UnlockedState or self._device.mount_point is None:
+            return
+        self._thread.start()
+        self._plan_id += 1
+        self._plan.emit(self._plan_id, self._files, self._device.mount_point)
 
     def start(self) -> None:
-        self.started.emit()
-        # ...and do whatever the export is supposed to be.
-        #
-        # This method would require proper error handling,
-        # and probably some guards along the lines of:
-        # if self._device.state != Device.UnlockedState:
+        self._failure = None
+        tracing.emit(self.started)
+        if not self._files:
+            return  # nothing to copy, in this demo the simulator decides how it ends
+
+        if self._device.state != Device.UnlockedState or self._device.mount_point is None:
+            self._failure = "The USB device is not unlocked."
+            tracing.emit(self.failed)
+            return
+
+        self._running = True
+        self._thread.start()
+        self._run_id += 1
+        self._run.emit(self._run_id, self._files, self._device.mount_point)
 
     def _on_device_state_changed(self, state: Device.State) -> None:
         if state != Device.UnlockedState:
-            self.failed.emit()
+            if self._running:
+                self._failure = "The USB device was locked or removed."
+            self._cancel()
+            tracing.emit(self.failed)
+
+    def _cancel(self) -> None:
+        self._running = False
+        self._engine.cancel()
+
+    def _is_current(self, run_id: int) -> bool:
+        # A cancelled run may still report, possibly once the next one started.
+        return self._running and run_id == self._run_id
+
+    @pyqtSlot(int)
+    def _on_engine_succeeded(self, run_id: int) -> None:
+        if self._is_current(run_id):
+            self._running = False
+            tracing.emit(self.succeeded)
+
+    @pyqtSlot(int, str)
+    def _on_engine_failed(self, run_id: int, reason: str) -> None:
+        if self._is_current(run_id):
+            self._running = False
+            self._failure = reason
+            tracing.emit(self.failed)
+
+    @pyqtSlot(int, str)
+    def _on_engine_file_exported(self, run_id: int, name: str) -> None:
+        if self._is_current(run_id):
+            tracing.emit(self.file_exported, name)
+
+    @pyqtSlot(int, "qint64", "qint64")
+    def _on_engine_progressed(self, run_id: int, written: int, total: int) -> None:
+        if self._is_current(run_id):
+            tracing.emit(self.progressed, written, total)
+
+    @pyqtSlot(int, int, "qint64", int, "qint64")
+    def _on_engine_planned(self, plan_id: int, files: int, size: int, total_files: int, total_size: int) -> None:
+        if plan_id == self._plan_id:
+            tracing.emit(self.planned, files, size, total_files, total_size)
+
+    @pyqtSlot(int, str)
+    def _on_engine_planning_failed(self, plan_id: int, reason: str) -> None:
+        if plan_id == self._plan_id:
+            tracing.emit(self.planning_failed, reason)
+
+    @pyqtSlot(int, str, str)
+    def _on_engine_backend_selected(self, run_id: int, name: str, backend: str) -> None:
+        if run_id == self._run_id:
+            tracing.emit(self.backend_selected, name, backend)
+
+    @pyqtSlot(int, "qint64")
+    def _on_scanner_progressed(self, files: int, size: int) -> None:
+        tracing.emit(self.scan_progressed, files, size)
+
+    @pyqtSlot(int, "qint64")
+    def _on_scanner_scanned(self, files: int, size: int) -> None:
+        self._totals = (files, size)
+        tracing.emit(self.scanned, files, size)
+
+    @pyqtSlot()
+    def _on_done(self) -> None:
+        tracing.emit(self.finished)
+
+    @pyqtSlot()
+    def _stop_threads(self) -> None:
+        self._cancel()
+        self._scanner.cancel()
+        for thread in [self._thread, self._scanner_thread]:
+            thread.quit()
+            thread.wait()
 
     # These commands and method are specific to the demonstration code.
     Command = NewType("Command", str)
@@ -47,11 +247,11 @@ class Service(QObject):
         """This method is specific to the demonstration code."""
         #print("Simulating a device check...")
         if desired_result == Service.EmitFailed:
-            self.failed.emit()
+            tracing.emit(self.failed)
             #print("Export failed.")
         if desired_result == Service.EmitSucceeded:
-            self.succeeded.emit()
+            tracing.emit(self.succeeded)
             #print("Export suceeded")
         if desired_result == Service.EmitFinished:
-            self.finished.emit()
+            tracing.emit(self.finished)
             #print("Export finished")
@@ -2,7 +2,6 @@ import sys
 from typing import List
 
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 from buttons import PushButton
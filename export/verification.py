@@ -0,0 +1,79 @@
+import hashlib
+import os
+import queue
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class Mismatch(Exception):
+    """Raised when the copy of a file doesn't match its source."""
+
+
+class ChunkHasher:
+    """Hashes a file, one chunk at a time, as the chunks get copied.
+
+    The hashing happens on an executor thread, so that it overlaps with
+    the copy of the following chunks. The chunks are read again from the
+    source, while they are most likely still in the page cache.
+    """
+
+    def __init__(self, executor: "Executor", source: str):
+        self._chunks = queue.SimpleQueue()
+        self._result = executor.submit(self._hash, source)
+
+    def update(self, size: int) -> None:
+        """Hash the next size bytes of the source."""
+        self._chunks.put(size)
+
+    def digest(self) -> bytes:
+        """Wait for all the chunks to be hashed."""
+        self._chunks.put(None)
+        return self._result.result()
+
+    def cancel(self) -> None:
+        self._chunks.put(None)
+
+    def _hash(self, source: str) -> bytes:
+        digest = new_digest()
+        offset = 0
+        with open(source, "rb", buffering=0) as file:
+            while True:
+                size = self._chunks.get()
+                if size is None:
+                    return digest.digest()
+                while size > 0:
+                    chunk = os.pread(file.fileno(), min(size, READ_CHUNK_SIZE), offset)
+                    if not chunk:
+                        break  # the source was truncated, the digests won't match
+                    digest.update(chunk)
+                    offset += len(chunk)
+                    size -= len(chunk)
+
+
+def new_digest():
+    """A digest of the kind read_back() returns, for data that is already in memory."""
+    return hashlib.blake2b()
+
+
+def read_back(path: str) -> bytes:
+    """Hash a file as it is stored on the device rather than in the page cache.
+
+    The file must have been synced, so that its pages are clean
+    and can actually be dropped from the cache.
+    """
+    digest = new_digest()
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        while True:
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if not chunk:
+                return digest.digest()
+            digest.update(chunk)
+    finally:
+        os.close(fd)
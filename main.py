@@ -1,22 +1,26 @@
+import os
 import sys
 
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
-from buttons import PushButton
+from buttons import PushButton, stylesheets
+from core import Core
 from wizard import Wizard
-from device import Device, Simulator as DeviceSimulator
+from device import Simulator as DeviceSimulator
 import export
+import tracing
 
 # Magic values.
 SEPARATOR = "separator"
 
 
 class Main(QMainWindow):
-    """The application main window."""
-    def __init__(self, parent=None):
+    """The application main window, a view on top of the core."""
+    def __init__(self, core: Core, parent=None):
         super().__init__(parent)
+        self._core = core
         self.setupUI()
         self._device_present = False
         self._device_locked = False
@@ -33,10 +37,10 @@ class Main(QMainWindow):
         layout = QVBoxLayout()
         self.centralWidget.setLayout(layout)
 
-        device = Device()
+        device = self._core.device
         device_simulator = DeviceSimulator(device)
 
-        export_service = export.Service(device)
+        export_service = self._core.export_service
         export_simulator = export.Simulator(export_service)
 
         wizard_launcher = QWidget()
@@ -102,13 +106,31 @@ def _addActions(parent, actions):
             action.setSeparator(True)
         parent.addAction(action)
 
-app = QApplication(sys.argv)
+def main():
+    app = QApplication(sys.argv)
 
-# Periodically listen for Unix signals (e.g. SIGINT)
-timer = QTimer()
-timer.start(500)
-timer.timeout.connect(lambda: None)
+    # Apply changes to the stylesheets without restarting, for development purposes.
+    stylesheets().set_hot_reload(bool(os.environ.get("WIZARD_HOT_RELOAD")))
 
-window = Main()
-window.show()
-sys.exit(app.exec())
+    # Record a trace of signals, state changes and page transitions, see the tracing package.
+    trace_path = os.environ.get("WIZARD_TRACE")
+    if trace_path:
+        tracing.start()
+        app.aboutToQuit.connect(lambda: tracing.stop(trace_path))
+
+    # Periodically listen for Unix signals (e.g. SIGINT)
+    timer = QTimer()
+    timer.start(500)
+    timer.timeout.connect(lambda: None)
+
+    # Optionally, passphrases are checked by a command rather than by hand in the simulator.
+    core = Core(app.arguments()[1:], unlock_command=os.environ.get("WIZARD_UNLOCK_COMMAND"))
+
+    window = Main(core)
+    window.show()
+    sys.exit(app.exec())
+
+
+# Compressing archives starts processes, which import this module again (see export.engine).
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+from .scenario import EVENTS, Scenario
+from .runner import Run, soak
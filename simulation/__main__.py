@@ -0,0 +1,62 @@
+"""Soak-test the wizard with randomized runs of a scenario, see simulation.Scenario.
+
+    python -m simulation SCENARIO [--runs N] [--seed S] [--trajectories FILE] [--errors-only]
+
+Runs use consecutive seeds, starting with S. Run several processes with
+different seeds to share the load. The exit status is 1 when any run
+had errors, their seeds are listed to reproduce them (with --runs 1).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from PyQt5.QtWidgets import *
+
+from .runner import soak
+from .scenario import Scenario
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soak-test the wizard with randomized runs of a scenario.")
+    parser.add_argument("scenario", help="the scenario file (JSON)")
+    parser.add_argument("--runs", type=int, default=1000, help="how many runs (by default, 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first run (by default, 0)")
+    parser.add_argument("--trajectories", help="where to save the trajectory of each run (JSON lines)")
+    parser.add_argument("--errors-only", action="store_true", help="only save the trajectories of runs that had errors")
+    arguments = parser.parse_args()
+
+    try:
+        scenario = Scenario.from_file(arguments.scenario)
+    except (OSError, ValueError, KeyError) as error:
+        parser.error(f"invalid scenario: {error}")
+
+    # The wizard is never shown.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])
+    trajectories = open(arguments.trajectories, "w") if arguments.trajectories else None
+
+    def on_run(result: dict) -> None:
+        if trajectories is not None and (result["errors"] or not arguments.errors_only):
+            trajectories.write(json.dumps(result) + "\n")
+
+    start = time.perf_counter()
+    try:
+        summary = soak(scenario, arguments.runs, arguments.seed, on_run)
+    finally:
+        if trajectories is not None:
+            trajectories.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{summary['runs']} runs in {elapsed:.1f}s ({summary['runs'] / elapsed:.0f} runs/s)")
+    for final, count in sorted(summary["finals"].items(), key=lambda item: -item[1]):
+        print(f"  {count:>8} ended on {final}")
+    if summary["failing_seeds"]:
+        seeds = summary["failing_seeds"]
+        print(f"{len(seeds)} runs had errors, seeds: {', '.join(str(seed) for seed in seeds[:20])}{', ...' if len(seeds) > 20 else ''}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Replay a recorded session against this build, and compare the outcomes and latencies.
+
+Sessions are recorded as traces (see the tracing package), e.g. with
+WIZARD_TRACE=session.json python main.py. The replay is headless: the
+device and export service only do what the trace says they did.
+
+    python -m simulation.replay TRACE [--speed FACTOR] [--output REPORT] [--compare BASELINE]
+
+By default, steps are replayed as fast as possible, --speed 1 replays
+them at the recorded speed. The exit status is 1 when the replay diverged
+from the recording, or when a baseline is given and the replay got slower
+by more than REGRESSION_THRESHOLD.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from device import Device
+from wizard import Wizard
+import export
+from .runner import click, page_name, submit_passphrase
+
+# Replaying got slower by more than that (relatively), see --compare.
+REGRESSION_THRESHOLD = 0.1
+
+# What the device is told by whatever monitors it (see device.Monitor).
+DEVICE_INPUTS = ["found_locked", "found_unlocked", "not_found", "unlocking_succeeded", "unlocking_failed", "locked"]
+# What the export service reports from its threads, outcomes and progress only matter during an export.
+EXPORT_INPUTS = ["scan_progressed", "scanned", "planned", "planning_failed", "backend_selected"]
+EXPORT_OUTCOMES = ["succeeded", "failed", "progressed", "file_exported"]
+
+
+class Step(NamedTuple):
+    """Something that happened from outside the wizard, and what it led to."""
+    at: float  # milliseconds since the first step
+    kind: str  # "device", "export" or "user"
+    name: str
+    args: list
+    recorded_duration: float  # milliseconds
+    page: str  # after the step, see runner.page_name()
+    state: str  # of the device, after the step
+
+
+def load(path: str) -> List[Step]:
+    """The steps of a trace, in order.
+
+    Steps are the events of the main thread that weren't caused by other ones
+    (i.e. nested in them), like the device being found, or a page being
+    initialized (by the Next button). Others, like changes of state,
+    are what they led to.
+    """
+    with open(path) as file:
+        events = json.load(file)["traceEvents"]
+
+    main_thread = next((event["tid"] for event in events if event["ph"] == "M" and event["args"]["name"] == "MainThread"), None)
+    events = sorted(
+        (event for event in events if event["ph"] in ["X", "i"] and event["tid"] == main_thread),
+        key=lambda event: (event["ts"], -event.get("dur", 0)),
+    )
+
+    steps = []
+    step = None
+    end = float("-inf")
+    page, state = page_name(-1), Device.UnknownState
+    for event in events:
+        if event["ph"] == "X" and event["ts"] >= end:
+            if step is not None:
+                steps.append(step._replace(page=page, state=state))
+            end = event["ts"] + event["dur"]
+            step = _step(event)
+        if event["ph"] == "i" and event["name"] == "current page":
+            page = page_name(event["args"]["id"])
+        elif event["ph"] == "X" and event["cat"] == "signal" and event["name"] == "state_changed":
+            state = ast.literal_eval(event["args"]["values"][0])
+    if step is not None:
+        steps.append(step._replace(page=page, state=state))
+
+    start = steps[0].at if steps else 0
+    return [step._replace(at=step.at - start) for step in steps]
+
+
+def _step(event: dict) -> Optional[Step]:
+    kind = None
+    name = event["name"]
+    args = []
+    if event["cat"] == "signal":
+        if name in DEVICE_INPUTS:
+            kind = "device"
+        elif name == "unlocking_started":
+            kind, name = "user", "submit_passphrase"
+        elif name in EXPORT_INPUTS or name in EXPORT_OUTCOMES:
+            kind = "export"
+            args = [ast.literal_eval(value) for value in event["args"]["values"]]
+    elif event["cat"] == "user":
+        kind = "user"
+    elif event["cat"] == "page":
+        kind = "user"
+        name = "next" if name.startswith("initialize") else "back"
+    if kind is None:
+        return None  # e.g. button hover effects
+    return Step(event["ts"] / 1000, kind, name, args, event["dur"] / 1000, "", "")
+
+
+class Replay:
+    """Replays steps against a fresh device, export service and wizard.
+
+    The wizard is restarted when it's finished, like the main window does.
+    """
+
+    def __init__(self, steps: List[Step], speed: Optional[float] = None):
+        self._steps = list(steps)
+        self._speed = speed
+        self._exporting = False
+
+    def execute(self) -> Dict:
+        """Replay the steps, and report the outcome and latency of each of them."""
+        device = Device()
+        service = export.Service(device)
+        QCoreApplication.instance().aboutToQuit.disconnect(service._stop_threads)
+        wizard = Wizard(device, service)
+        wizard.finished.connect(wizard.restart)
+        service.started.connect(lambda: setattr(self, "_exporting", True))
+        service.finished.connect(lambda: setattr(self, "_exporting", False))
+
+        def apply(step: Step) -> None:
+            if step.kind == "device":
+                device.check(Device.Command(step.name))
+            elif step.kind == "export":
+                if step.name in EXPORT_INPUTS:
+                    getattr(service, step.name).emit(*step.args)
+                elif self._exporting and step.name in ["succeeded", "failed"]:
+                    service.check(export.Service.Command(step.name))
+                elif self._exporting:
+                    getattr(service, step.name).emit(*step.args)
+            elif step.name == "submit_passphrase":
+                submit_passphrase(wizard)
+            elif step.name == "next":
+                click(wizard, QWizard.NextButton)
+            elif step.name == "back":
+                click(wizard, QWizard.BackButton)
+            elif step.name == "finish":
+                click(wizard, QWizard.FinishButton)
+            elif step.name == "cancel":
+                wizard.reject()
+            elif step.name == "show":
+                wizard.show()
+            elif step.name == "hide":
+                wizard.hide()
+            elif step.name == "restart":
+                wizard.restart()
+
+        results = []
+        start = time.perf_counter()
+        try:
+            for step in self._steps:
+                if self._speed:
+                    self._wait_until(start + step.at / 1000 / self._speed)
+                before = time.perf_counter()
+                apply(step)
+                QCoreApplication.processEvents()
+                latency = (time.perf_counter() - before) * 1000
+                page, state = page_name(wizard.currentId()), device.state
+                results.append({
+                    "at": round(step.at, 3),
+                    "step": f"{step.kind} {step.name}",
+                    "latency_ms": round(latency, 3),
+                    "recorded_ms": round(step.recorded_duration, 3),
+                    "expected": {"page": step.page, "state": step.state},
+                    "actual": {"page": page, "state": state},
+                    "diverged": (page, state) != (step.page, step.state),
+                })
+            final = {"page": page_name(wizard.currentId()), "state": device.state}
+        finally:
+            service._stop_threads()
+            wizard.finished.disconnect(wizard.restart)
+            wizard.close()
+
+        latencies = [result["latency_ms"] for result in results]
+        return {
+            "steps": results,
+            "final": {
+                "expected": {"page": self._steps[-1].page, "state": self._steps[-1].state} if self._steps else None,
+                "actual": final,
+            },
+            "diverged_steps": sum(result["diverged"] for result in results),
+            "latency_ms": {
+                "total": round(sum(latencies), 3),
+                "median": round(statistics.median(latencies), 3) if latencies else 0,
+                "max": round(max(latencies), 3) if latencies else 0,
+            },
+        }
+
+    def _wait_until(self, deadline: float) -> None:
+        # Whatever the event loop would do meanwhile (e.g. timers) is done too.
+        delay = int((deadline - time.perf_counter()) * 1000)
+        if delay > 0:
+            loop = QEventLoop()
+            QTimer.singleShot(delay, loop.quit)
+            loop.exec()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded session, headless.")
+    parser.add_argument("trace", help="the trace of the session (see WIZARD_TRACE)")
+    parser.add_argument("--speed", type=float, help="replay at that factor of the recorded speed (by default, as fast as possible)")
+    parser.add_argument("--output", help="where to save the report (JSON)")
+    parser.add_argument("--compare", help="a previous report, to compare the latencies with")
+    arguments = parser.parse_args()
+
+    steps = load(arguments.trace)
+    # The wizard is shown if it was, but nobody watches.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])
+    report = Replay(steps, arguments.speed).execute()
+
+    for result in report["steps"]:
+        marker = "!" if result["diverged"] else " "
+        print(f"{marker} {result['at']:>10.1f} ms  {result['step']:<30} {result['latency_ms']:>8.3f} ms (recorded {result['recorded_ms']:.3f} ms)  "
+              f"{result['actual']['page']}/{result['actual']['state']}"
+              + (f", expected {result['expected']['page']}/{result['expected']['state']}" if result["diverged"] else ""))
+    final = report["final"]
+    latency = report["latency_ms"]
+    print(f"{len(report['steps'])} steps, {report['diverged_steps']} diverged, "
+          f"latency: {latency['total']:.3f} ms in total, {latency['median']:.3f} ms median, {latency['max']:.3f} ms max")
+    print(f"Final: {final['actual']}, recorded: {final['expected']}")
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    failed = report["diverged_steps"] > 0 or final["actual"] != final["expected"]
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)["latency_ms"]["total"]
+        change = (latency["total"] - baseline) / baseline if baseline else 0
+        print(f"Total latency: {baseline:.3f} ms -> {latency['total']:.3f} ms ({change:+.1%})")
+        failed = failed or change > REGRESSION_THRESHOLD
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import random
+import sys
+import traceback
+from typing import Callable, Dict
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from device import Device
+from wizard import Wizard
+import export
+from .scenario import Scenario
+
+
+class Run:
+    """One run of a scenario, against a fresh device, export service and wizard.
+
+    Time is simulated: events are applied in order, as fast as possible,
+    and pending Qt events are processed after each of them. The run ends
+    when nothing is left to happen. The wizard is never shown.
+
+    The trajectory records the events, and what they caused, as
+    [time, kind, value] entries: kinds are "event", "state" (of the device),
+    "page" (of the wizard), "export" (succeeded or failed) and "error".
+    Errors are exceptions raised by the wizard, and violations of its
+    rules, e.g. reviewing data while the device is locked.
+    """
+
+    def __init__(self, scenario: Scenario, seed: int):
+        self.seed = seed
+        self.trajectory = []
+        self.errors = []
+
+        self._scenario = scenario
+        self._random = random.Random(seed)
+        self._queue = []
+        self._sequence = itertools.count()  # keeps simultaneous events in order
+        self._now = 0.0
+        self._unlocking = 0  # identifies the latest unlocking attempt
+        self._exporting = False
+
+    def execute(self) -> Dict:
+        """Run the scenario, and return the final state and the trajectory."""
+        device = Device()
+        service = export.Service(device)
+        # There is one service per run, its threads are stopped as soon as it's done.
+        QCoreApplication.instance().aboutToQuit.disconnect(service._stop_threads)
+        wizard = Wizard(device, service)
+        self._device, self._service, self._wizard = device, service, wizard
+
+        device.state_changed.connect(lambda state: self._record("state", state))
+        device.unlocking_started.connect(self._on_unlocking_started)
+        service.started.connect(self._on_export_started)
+        service.succeeded.connect(lambda: self._record("export", "succeeded"))
+        service.failed.connect(lambda: self._record("export", "failed"))
+        service.finished.connect(self._on_export_finished)
+        wizard.currentIdChanged.connect(lambda id: self._record("page", page_name(id)))
+
+        actions = {
+            "insert_locked": lambda: device.check(Device.EmitFoundLocked),
+            "insert_unlocked": lambda: device.check(Device.EmitFoundUnlocked),
+            "yank": lambda: device.check(Device.EmitNotFound),
+            "lock": lambda: device.check(Device.EmitLocked),
+            "unlock": lambda: device.check(Device.EmitUnlockingSucceeded),
+            "unlock_fail": lambda: device.check(Device.EmitUnlockingFailed),
+            "export_succeed": lambda: self._exporting and service.check(export.Service.EmitSucceeded),
+            "export_fail": lambda: self._exporting and service.check(export.Service.EmitFailed),
+            "next": lambda: click(wizard, QWizard.NextButton),
+            "back": lambda: click(wizard, QWizard.BackButton),
+            "restart": wizard.restart,
+            "submit_passphrase": lambda: submit_passphrase(wizard),
+        }
+
+        hook, sys.excepthook = sys.excepthook, self._on_exception
+        try:
+            self._step("restart", wizard.restart)  # what showing the wizard would do
+            for at, event in self._scenario.timeline(self._random):
+                self._schedule(at, event, actions[event])
+            while self._queue:
+                self._now, _, event, action = heapq.heappop(self._queue)
+                self._step(event, action)
+        finally:
+            sys.excepthook = hook
+            service._stop_threads()
+
+        return {
+            "seed": self.seed,
+            "final": {"page": page_name(wizard.currentId()), "state": device.state},
+            "errors": self.errors,
+            "trajectory": self.trajectory,
+        }
+
+    def _schedule(self, at: float, event: str, action: Callable[[], None]) -> None:
+        heapq.heappush(self._queue, (float(at), next(self._sequence), event, action))
+
+    def _step(self, event: str, action: Callable[[], None]) -> None:
+        self._record("event", event)
+        try:
+            action()
+            QCoreApplication.processEvents()
+        except Exception:
+            self._on_exception(*sys.exc_info())
+        self._check_rules()
+
+    def _record(self, kind: str, value: str) -> None:
+        self.trajectory.append([round(self._now, 3), kind, value])
+
+    def _error(self, message: str) -> None:
+        self.errors.append(message)
+        self._record("error", message)
+
+    def _on_exception(self, type, value, trace) -> None:
+        # Exceptions raised in slots end up here rather than aborting.
+        self._error("".join(traceback.format_exception_only(type, value)).strip())
+
+    def _check_rules(self) -> None:
+        # The rules of Wizard._on_device_state_changed, once things settled.
+        page = self._wizard.currentId()
+        state = self._device.state
+        if Wizard.PageId.INSERT_DEVICE < page < Wizard.PageId.EXPORT and state in [Device.MissingState, Device.RemovedState]:
+            self._error(f"On the {page_name(page)} page while the device is {state}")
+        elif page == Wizard.PageId.REVIEW_DATA and state != Device.UnlockedState:
+            self._error(f"On the {page_name(page)} page while the device is {state}")
+
+    def _on_unlocking_started(self, passphrase: str) -> None:
+        self._unlocking += 1
+        attempt = self._unlocking
+        failed = self._scenario.fails("unlock", self._random)
+
+        def respond() -> None:
+            if attempt == self._unlocking and self._device.state == Device.UnlockingState:
+                self._device.check(Device.EmitUnlockingFailed if failed else Device.EmitUnlockingSucceeded)
+
+        at = self._now + self._scenario.latency("unlock", self._random)
+        self._schedule(at, "unlock_fail" if failed else "unlock", respond)
+
+    def _on_export_started(self) -> None:
+        self._exporting = True
+        failed = self._scenario.fails("export", self._random)
+        at = self._now + self._scenario.latency("export", self._random)
+        self._schedule(at, "export_fail" if failed else "export_succeed", lambda: self._exporting and self._service.check(
+            export.Service.EmitFailed if failed else export.Service.EmitSucceeded))
+
+    def _on_export_finished(self) -> None:
+        self._exporting = False
+
+
+def soak(scenario: Scenario, runs: int, seed: int = 0, on_run: Callable[[Dict], None] = None) -> Dict:
+    """Run a scenario many times, with consecutive seeds, and summarize the outcomes.
+
+    Each run can be reproduced on its own with its seed.
+    """
+    finals = {}
+    failing_seeds = []
+    for index in range(runs):
+        result = Run(scenario, seed + index).execute()
+        final = f"{result['final']['page']}/{result['final']['state']}"
+        finals[final] = finals.get(final, 0) + 1
+        if result["errors"]:
+            failing_seeds.append(result["seed"])
+        if on_run is not None:
+            on_run(result)
+    return {"runs": runs, "finals": finals, "failing_seeds": failing_seeds}
+
+
+def click(wizard: Wizard, which: QWizard.WizardButton) -> None:
+    """Click a button of the wizard, if people could."""
+    # Unlike QWizard.next(), which ignores whether the page is complete.
+    button = wizard.button(which)
+    if button.isEnabled() and not button.isHidden():
+        button.click()
+
+
+def submit_passphrase(wizard: Wizard) -> None:
+    """Submit a passphrase on the unlock page, if people could."""
+    if wizard.currentId() != Wizard.PageId.UNLOCK_DEVICE:
+        return
+    page = wizard.currentPage().page()
+    if page is not None and not page.passphrase_input.isHidden():
+        page.passphrase_input.button_clicked.emit()
+
+
+def page_name(id: int) -> str:
+    try:
+        return Wizard.PageId(id).name
+    except ValueError:
+        return "NONE"  # e.g. before the wizard started
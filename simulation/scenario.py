@@ -0,0 +1,154 @@
+import json
+import random
+from typing import Dict, List, Optional, Tuple, Union
+
+# What can happen during a scenario: what the device and export simulators
+# allow to do with their buttons, and what people do with the wizard.
+EVENTS = (
+    "insert_locked",  # a locked USB device is plugged in
+    "insert_unlocked",
+    "yank",  # the USB device is removed
+    "lock",
+    "unlock",  # unlocked by other means than the wizard
+    "unlock_fail",
+    "export_succeed",  # only while an export is running
+    "export_fail",
+    "next",  # the wizard buttons
+    "back",
+    "restart",
+    "submit_passphrase",  # only on the unlock page
+)
+
+# How long the device takes to respond to a passphrase, and the export to finish,
+# in milliseconds. The defaults are the loading times of the simulators.
+LATENCIES = {
+    "unlock": 1200,
+    "export": 1500,
+}
+
+# What fails with some probability, see LATENCIES.
+FAILURES = {
+    "unlock": 0.0,
+    "export": 0.0,
+}
+
+# A constant, in milliseconds, or a distribution, e.g. {"distribution": "uniform", "low": 100, "high": 300}.
+Latency = Union[float, Dict[str, Union[str, float]]]
+
+# The parameters of each distribution, see the random module.
+_DISTRIBUTIONS = {
+    "constant": ("value",),
+    "uniform": ("low", "high"),
+    "exponential": ("mean",),
+    "normal": ("mean", "stddev"),
+    "lognormal": ("mu", "sigma"),
+}
+
+
+class Scenario:
+    """Timed events, and how the simulated device and export respond to them.
+
+    Events happen at given times, or at random with given rates (per second of
+    simulated time) until the scenario's duration. Unlocking and exports end
+    after a latency sampled from a distribution, and fail with a given probability.
+    Scenarios are usually loaded from JSON files, for example:
+
+        {
+            "duration": 60000,
+            "events": [{"at": 0, "event": "insert_locked"}, {"at": 100, "event": "next"}],
+            "rates": {"next": 2, "yank": 0.05, "submit_passphrase": 0.5},
+            "latencies": {"unlock": {"distribution": "lognormal", "mu": 7, "sigma": 0.5}},
+            "failures": {"unlock": 0.2, "export": 0.1}
+        }
+
+    Times and latencies are in milliseconds.
+    """
+
+    def __init__(self,
+                 events: Optional[List[Tuple[float, str]]] = None,
+                 rates: Optional[Dict[str, float]] = None,
+                 duration: float = 0,
+                 latencies: Optional[Dict[str, Latency]] = None,
+                 failures: Optional[Dict[str, float]] = None):
+        self.events = sorted(events or [])
+        self.rates = dict(rates or {})
+        self.duration = duration
+        self.latencies = dict(LATENCIES, **(latencies or {}))
+        self.failures = dict(FAILURES, **(failures or {}))
+
+        for _, event in self.events:
+            _check(event in EVENTS, f"Unknown event: {event}")
+        for event, rate in self.rates.items():
+            _check(event in EVENTS, f"Unknown event: {event}")
+            _check(rate >= 0, f"Negative rate for {event}")
+        for name, latency in self.latencies.items():
+            _check(name in LATENCIES, f"Unknown latency: {name}")
+            _check_latency(latency)
+        for name, probability in self.failures.items():
+            _check(name in FAILURES, f"Unknown failure: {name}")
+            _check(0 <= probability <= 1, f"The probability of {name} failures isn't between 0 and 1")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scenario":
+        return cls(
+            events=[(event["at"], event["event"]) for event in data.get("events", [])],
+            rates=data.get("rates"),
+            duration=data.get("duration", 0),
+            latencies=data.get("latencies"),
+            failures=data.get("failures"),
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "Scenario":
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def timeline(self, generator: random.Random) -> List[Tuple[float, str]]:
+        """The timed events, and random ones drawn from the rates (Poisson processes)."""
+        events = list(self.events)
+        for event, rate in sorted(self.rates.items()):
+            if rate <= 0:
+                continue
+            at = generator.expovariate(rate / 1000)
+            while at < self.duration:
+                events.append((at, event))
+                at += generator.expovariate(rate / 1000)
+        return sorted(events)
+
+    def latency(self, name: str, generator: random.Random) -> float:
+        return _sample(self.latencies[name], generator)
+
+    def fails(self, name: str, generator: random.Random) -> bool:
+        return generator.random() < self.failures[name]
+
+
+def _sample(latency: Latency, generator: random.Random) -> float:
+    if not isinstance(latency, dict):
+        return float(latency)
+    distribution = latency["distribution"]
+    if distribution == "constant":
+        value = latency["value"]
+    elif distribution == "uniform":
+        value = generator.uniform(latency["low"], latency["high"])
+    elif distribution == "exponential":
+        value = generator.expovariate(1 / latency["mean"])
+    elif distribution == "normal":
+        value = generator.gauss(latency["mean"], latency["stddev"])
+    else:
+        value = generator.lognormvariate(latency["mu"], latency["sigma"])
+    return max(0.0, value)  # nothing happens before it's caused
+
+
+def _check_latency(latency: Latency) -> None:
+    if not isinstance(latency, dict):
+        _check(latency >= 0, f"Negative latency: {latency}")
+        return
+    parameters = _DISTRIBUTIONS.get(latency.get("distribution"))
+    _check(parameters is not None, f"Unknown distribution: {latency.get('distribution')}")
+    missing = [parameter for parameter in parameters if parameter not in latency]
+    _check(not missing, f"Missing parameters for the {latency['distribution']} distribution: {', '.join(missing)}")
+
+
+def _check(condition: bool, message: str) -> None:
+    if not condition:
+        raise ValueError(message)
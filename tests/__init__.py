@@ -0,0 +1,8 @@
+import os
+
+from PyQt5.QtWidgets import *
+
+# One application for all the tests, whatever their order: there can only be one,
+# and widgets need a QApplication. Nothing is ever shown.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+app = QApplication.instance() or QApplication([])
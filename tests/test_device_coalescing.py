@@ -0,0 +1,102 @@
+import time
+import unittest
+
+from PyQt5.QtCore import *
+
+from device import Device
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+# A flaky USB connector: about 10k transitions/s, in bursts shorter than the coalescing window.
+RATE = 10000
+TICK_IN_MS = 10
+BURST_IN_MS = 200
+WINDOW_IN_MS = 1000
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def flap(self, device: Device, transitions: int) -> float:
+        """Fire transitions between a locked and a missing device, and return how long it took."""
+        commands = [Device.EmitFoundLocked, Device.EmitNotFound]
+        fired = 0
+        loop = QEventLoop()
+
+        def fire() -> None:
+            nonlocal fired
+            for _ in range(min(RATE * TICK_IN_MS // 1000, transitions - fired)):
+                device.check(commands[fired % 2])
+                fired += 1
+            if fired == transitions:
+                loop.quit()
+
+        timer = QTimer()
+        timer.timeout.connect(fire)
+        start = time.perf_counter()
+        timer.start(TICK_IN_MS)
+        loop.exec()
+        timer.stop()
+        return time.perf_counter() - start
+
+    def wait(self, milliseconds: int) -> None:
+        loop = QEventLoop()
+        QTimer.singleShot(milliseconds, loop.quit)
+        loop.exec()
+
+    def test_burst(self):
+        device = Device()
+        device.set_coalescing_window(WINDOW_IN_MS)
+        emitted = []
+        device.state_changed.connect(emitted.append)
+
+        transitions = RATE * BURST_IN_MS // 1000
+        elapsed = self.flap(device, transitions)
+        self.assertLess(elapsed * 1000, WINDOW_IN_MS, "the burst must fit in the window")
+        self.assertEqual(emitted, [])
+        self.assertEqual(device.state, Device.UnknownState)
+
+        self.wait(WINDOW_IN_MS + 100)
+        # The burst ends with the device missing again, i.e. removed.
+        self.assertEqual(emitted, [Device.RemovedState])
+        self.assertEqual(device.state, Device.RemovedState)
+        # Every transition but the last one was superseded by the next.
+        self.assertEqual(device.suppressed_transitions, {
+            Device.LockedState: transitions // 2,
+            Device.RemovedState: transitions // 2 - 1,
+        })
+
+    def test_burst_back_to_where_it_started(self):
+        device = Device()
+        device.check(Device.EmitFoundLocked)
+        device.set_coalescing_window(WINDOW_IN_MS)
+        emitted = []
+        device.state_changed.connect(emitted.append)
+
+        # Starting with the device locked, an even number of transitions ends with it locked again,
+        # which is suppressed too when the window expires.
+        transitions = RATE * BURST_IN_MS // 1000
+        commands = [Device.EmitNotFound, Device.EmitFoundLocked]
+        for index in range(transitions):
+            device.check(commands[index % 2])
+        self.wait(WINDOW_IN_MS + 100)
+
+        self.assertEqual(emitted, [])
+        self.assertEqual(device.state, Device.LockedState)
+        self.assertEqual(device.suppressed_transitions, {
+            Device.RemovedState: transitions // 2,
+            Device.LockedState: transitions // 2,
+        })
+
+    def test_no_window(self):
+        device = Device()
+        emitted = []
+        device.state_changed.connect(emitted.append)
+
+        self.flap(device, 100)
+        self.assertEqual(len(emitted), 100)
+        self.assertEqual(device.state, Device.RemovedState)
+        self.assertEqual(device.suppressed_transitions, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
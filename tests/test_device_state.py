@@ -0,0 +1,89 @@
+import itertools
+import unittest
+
+from device.main import _State
+
+STATES = ["unknown", "missing", "resting", "unlocking", "unlocked"]
+EVENTS = ["found_locked", "found_unlocked", "not_found", "unlocking_started", "unlocking_failed", "unlocking_succeeded", "locked"]
+
+# The state chart (see _State), spelled out. Any other event is ignored.
+TRANSITIONS = {
+    ("unknown", "found_unlocked"): "unlocked",
+    ("unknown", "found_locked"): "resting",
+    ("unknown", "not_found"): "missing",
+    ("missing", "found_unlocked"): "unlocked",
+    ("missing", "found_locked"): "resting",
+    ("resting", "not_found"): "missing",
+    ("resting", "unlocking_started"): "unlocking",
+    ("resting", "unlocking_succeeded"): "unlocked",
+    ("unlocking", "not_found"): "missing",
+    ("unlocking", "unlocking_failed"): "resting",
+    ("unlocking", "unlocking_succeeded"): "unlocked",
+    ("unlocked", "not_found"): "missing",
+    ("unlocked", "locked"): "resting",
+}
+
+
+class StateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.entered = []
+        self.state = _State(self.entered.append)
+
+    def test_initial_state(self):
+        self.assertEqual(self.state.current, _State.unknown)
+        self.assertEqual(self.entered, [_State.unknown])
+
+    def test_names(self):
+        self.assertEqual(list(_State.names), STATES)
+        for index, name in enumerate(STATES):
+            self.assertEqual(getattr(_State, name), index)
+        for index, name in enumerate(EVENTS):
+            self.assertEqual(getattr(_State, name), index)
+
+    def test_transitions(self):
+        for state, event in itertools.product(STATES, EVENTS):
+            with self.subTest(state=state, event=event):
+                self.state.current = getattr(_State, state)
+                self.entered.clear()
+
+                target = TRANSITIONS.get((state, event))
+                transitioned = self.state.fire(getattr(_State, event))
+
+                if target is None:
+                    # Ignored: the state is neither changed nor entered again.
+                    self.assertFalse(transitioned)
+                    self.assertEqual(self.state.current, getattr(_State, state))
+                    self.assertEqual(self.entered, [])
+                else:
+                    self.assertTrue(transitioned)
+                    self.assertEqual(_State.names[self.state.current], target)
+                    self.assertEqual(self.entered, [getattr(_State, target)])
+
+    def test_every_state_is_reachable(self):
+        reached = {"unknown"}
+        pending = ["unknown"]
+        while pending:
+            state = pending.pop()
+            for event in EVENTS:
+                self.state.current = getattr(_State, state)
+                if self.state.fire(getattr(_State, event)):
+                    target = _State.names[self.state.current]
+                    if target not in reached:
+                        reached.add(target)
+                        pending.append(target)
+        self.assertEqual(reached, set(STATES))
+
+    def test_invalid_events(self):
+        for event in [-1, -len(EVENTS), len(EVENTS), 100]:
+            with self.subTest(event=event):
+                self.state.current = _State.unlocked
+                self.entered.clear()
+                with self.assertRaises(ValueError):
+                    self.state.fire(event)
+                self.assertEqual(self.state.current, _State.unlocked)
+                self.assertEqual(self.entered, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import contextlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from export import backends
+
+CHUNK_SIZE = 4096
+
+
+class CopyTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._directory.name, "source.bin")
+        self.sink = os.path.join(self._directory.name, "sink.bin")
+        self.data = os.urandom(8 * CHUNK_SIZE)
+        with open(self.source, "wb") as file:
+            file.write(self.data)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def copy(self, on_chunk=lambda size: None) -> backends.Backend:
+        buffer = memoryview(bytearray(CHUNK_SIZE))
+        with open(self.source, "rb", buffering=0) as source, open(self.sink, "wb", buffering=0) as sink:
+            return backends.copy(source.fileno(), sink.fileno(), len(self.data), buffer, on_chunk)
+
+    def without_kernel(self, disabled: bool):
+        # The kernel copies are tried first, making them fail leaves the fallback.
+        if not disabled:
+            return contextlib.nullcontext()
+        return mock.patch.object(backends, "_kernel_copy", side_effect=backends._Unsupported)
+
+    def test_copy(self):
+        for fallback in [False, True]:
+            with self.subTest(fallback=fallback), self.without_kernel(fallback):
+                backend = self.copy()
+                self.assertEqual(backend == backends.ReadInto, fallback)
+                with open(self.sink, "rb") as file:
+                    self.assertEqual(file.read(), self.data)
+
+    def test_source_shrinks(self):
+        # Every backend stops at the end of the file, whatever size was expected.
+        for fallback in [False, True]:
+            with self.subTest(fallback=fallback), self.without_kernel(fallback):
+                with open(self.source, "wb") as file:
+                    file.write(self.data)
+                with self.assertRaises(backends.SizeMismatch) as context:
+                    self.copy(lambda size: os.truncate(self.source, CHUNK_SIZE))
+                self.assertEqual(context.exception.copied, CHUNK_SIZE)
+
+    def test_source_emptied(self):
+        # The kernel calls copy nothing, and the fallback reads nothing either.
+        os.truncate(self.source, 0)
+        with self.assertRaises(backends.SizeMismatch) as context:
+            self.copy()
+        self.assertEqual(context.exception.copied, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,297 @@
+import filecmp
+import os
+import tarfile
+import tempfile
+import unittest
+from typing import Optional
+from unittest import mock
+
+from PyQt5.QtCore import *
+
+from export import archive
+from export import engine as engine_module
+from export.engine import Engine
+from export.journal import FILENAME as JOURNAL
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+CHUNK_SIZE = 4096
+
+
+class EngineTest(unittest.TestCase):
+    """The engine runs on the test thread, its signals are delivered directly."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._directory.name, "files")
+        self.destination = os.path.join(self._directory.name, "device")
+        os.makedirs(self.source)
+        os.makedirs(self.destination)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def make_files(self, count: int, size: int = 3 * CHUNK_SIZE) -> None:
+        for index in range(count):
+            with open(os.path.join(self.source, f"{index:03}.bin"), "wb") as file:
+                file.write(os.urandom(size))
+
+    def engine(self, workers: int = 1) -> Engine:
+        engine = Engine(chunk_size=CHUNK_SIZE, workers=workers)
+        self.outcomes = []
+        self.exported = []
+        self.backends = {}
+        engine.succeeded.connect(lambda run_id: self.outcomes.append("succeeded"), Qt.DirectConnection)
+        engine.failed.connect(lambda run_id, reason: self.outcomes.append(reason), Qt.DirectConnection)
+        engine.file_exported.connect(lambda run_id, name: self.exported.append(name), Qt.DirectConnection)
+        engine.backend_selected.connect(lambda run_id, name, backend: self.backends.__setitem__(name, backend), Qt.DirectConnection)
+        return engine
+
+    def exported_tree(self, destination: Optional[str] = None) -> str:
+        return os.path.join(destination or self.destination, "files")
+
+    def assertSameTree(self, destination: Optional[str] = None):
+        exported = self.exported_tree(destination)
+        comparison = filecmp.dircmp(self.source, exported)
+        self.assertEqual((comparison.left_only, comparison.right_only), ([], []))
+        _, mismatches, errors = filecmp.cmpfiles(self.source, exported, comparison.common_files, shallow=False)
+        self.assertEqual((mismatches, errors), ([], []))
+
+    def test_export(self):
+        self.make_files(10)
+        engine = self.engine(workers=4)
+        engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(len(self.exported), 10)
+        self.assertSameTree()
+        self.assertFalse(os.path.exists(os.path.join(self.destination, JOURNAL)))
+
+    def test_cancel_then_resume(self):
+        self.make_files(20)
+        engine = self.engine(workers=4)
+        engine.file_exported.connect(lambda run_id, name: len(self.exported) == 5 and engine.cancel(), Qt.DirectConnection)
+        engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, ["The export was cancelled."])
+        self.assertLess(len(self.exported), 20)
+        # Kept for the next export to resume from.
+        self.assertTrue(os.path.exists(os.path.join(self.destination, JOURNAL)))
+        copied = set(self.backends)
+        self.assertTrue(copied)
+
+        engine = self.engine(workers=4)
+        engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(len(self.exported), 20)
+        # The files copied by the first export weren't copied again.
+        self.assertFalse(copied & set(self.backends))
+        self.assertSameTree()
+        self.assertFalse(os.path.exists(os.path.join(self.destination, JOURNAL)))
+
+    def test_resume_within_a_file(self):
+        self.make_files(1, size=16 * CHUNK_SIZE)
+        engine = self.engine()
+        chunks = []
+        on_chunk = engine._on_chunk
+
+        def cancel_halfway(size: int) -> None:
+            chunks.append(size)
+            if len(chunks) == 10:
+                engine.cancel()
+            on_chunk(size)
+
+        engine._on_chunk = cancel_halfway
+        with mock.patch.object(engine_module, "CHECKPOINT_BYTES", 4 * CHUNK_SIZE):
+            engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["The export was cancelled."])
+
+        engine = self.engine()
+        chunks.clear()
+        engine._on_chunk = chunks.append
+        engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        # Resumed from the last checkpoint, after the 8 first chunks.
+        self.assertEqual(sum(chunks), 8 * CHUNK_SIZE)
+        self.assertSameTree()
+
+    def test_incremental(self):
+        self.make_files(5)
+        engine = self.engine()
+        engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["succeeded"])
+
+        # Resized, rewritten with the same size, touched only, and new.
+        with open(os.path.join(self.source, "001.bin"), "ab") as file:
+            file.write(b"more")
+        stat = os.stat(os.path.join(self.source, "002.bin"))
+        with open(os.path.join(self.source, "002.bin"), "r+b") as file:
+            file.write(b"changed")
+        os.utime(os.path.join(self.source, "002.bin"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        stat = os.stat(os.path.join(self.source, "003.bin"))
+        os.utime(os.path.join(self.source, "003.bin"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+        with open(os.path.join(self.source, "005.bin"), "wb") as file:
+            file.write(b"new")
+
+        engine = self.engine()
+        engine.set_incremental(True)
+        engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        # Skipped files count as exported, they're on the device.
+        self.assertEqual(len(self.exported), 6)
+        self.assertEqual(sorted(self.backends), [os.path.join("files", name) for name in ["001.bin", "002.bin", "005.bin"]])
+        self.assertSameTree()
+
+    def test_verification_mismatch(self):
+        self.make_files(1)
+        engine = self.engine()
+        engine.set_verification(True)
+        # As if the device returned something else than what was written.
+        with mock.patch("export.verification.read_back", return_value=b"corrupted"):
+            engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, [f"The copy of {os.path.join('files', '000.bin')} doesn't match the original file."])
+        self.assertEqual(self.exported, [])
+
+        # The copy isn't trusted by the next export.
+        engine = self.engine()
+        engine.set_verification(True)
+        engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(list(self.backends), [os.path.join("files", "000.bin")])
+        self.assertSameTree()
+
+    def test_source_shrinks(self):
+        self.make_files(1, size=8 * CHUNK_SIZE)
+        source = os.path.join(self.source, "000.bin")
+        engine = self.engine()
+        on_chunk = engine._on_chunk
+
+        def shrink(size: int) -> None:
+            on_chunk(size)
+            os.truncate(source, CHUNK_SIZE)
+
+        engine._on_chunk = shrink
+        engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, [f"{os.path.join('files', '000.bin')} was modified during the export."])
+        self.assertEqual(self.exported, [])
+
+        # The journal doesn't have the truncated copy as complete.
+        engine = self.engine()
+        engine.run(1, [self.source], self.destination)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(self.backends, {os.path.join("files", "000.bin"): mock.ANY})
+        self.assertSameTree()
+
+    def test_fan_out(self):
+        self.make_files(5)
+        destinations = [os.path.join(self._directory.name, name) for name in ["first", "second", "third"]]
+        for destination in destinations:
+            os.makedirs(destination)
+        # The second destination fails on the third file, it can't be written over a directory.
+        os.makedirs(os.path.join(destinations[1], "files", "002.bin"))
+        engine = self.engine()
+        failures = []
+        engine.target_failed.connect(lambda run_id, destination, reason: failures.append(destination), Qt.DirectConnection)
+        engine.fan_out(1, [self.source], destinations)
+
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(failures, [destinations[1]])
+        self.assertEqual(len(self.exported), 5)
+        self.assertSameTree(destinations[0])
+        self.assertSameTree(destinations[2])
+        # Nothing more was written to the failed destination.
+        self.assertEqual(sorted(os.listdir(self.exported_tree(destinations[1]))), ["000.bin", "001.bin", "002.bin"])
+
+    def test_fan_out_fails_everywhere(self):
+        self.make_files(2)
+        destinations = [os.path.join(self._directory.name, name) for name in ["first", "second"]]
+        for destination in destinations:
+            os.makedirs(os.path.join(destination, "files", "001.bin"))
+        engine = self.engine()
+        engine.fan_out(1, [self.source], destinations)
+        self.assertEqual(self.outcomes, ["The export failed on every USB device."])
+
+    def test_fan_out_source_shrinks(self):
+        self.make_files(1, size=8 * CHUNK_SIZE)
+        source = os.path.join(self.source, "000.bin")
+        destinations = [os.path.join(self._directory.name, name) for name in ["first", "second"]]
+        for destination in destinations:
+            os.makedirs(destination)
+        engine = self.engine()
+        progress = engine._progress
+
+        def shrink(size: int) -> None:
+            progress(size)
+            os.truncate(source, CHUNK_SIZE)
+
+        engine._progress = shrink
+        engine.fan_out(1, [self.source], destinations)
+
+        self.assertEqual(self.outcomes, [f"{os.path.join('files', '000.bin')} was modified during the export."])
+        self.assertEqual(self.exported, [])
+
+    def test_archive(self):
+        self.make_files(10)
+        engine = self.engine()
+        engine.set_archive(archive.CompressedTar)
+        engine.set_verification(True)
+        engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, ["succeeded"])
+        [name] = os.listdir(self.destination)
+        self.assertTrue(name.endswith(".tar.gz"))
+        with tarfile.open(os.path.join(self.destination, name)) as file:
+            file.extractall(self.destination, filter="data")
+        self.assertSameTree()
+
+    def test_archive_names_collide(self):
+        self.make_files(3)
+        # Another archive from the same second.
+        existing = os.path.join(self.destination, "export-20260101-000000.tar")
+        with open(existing, "wb") as file:
+            file.write(b"existing")
+
+        with mock.patch("time.strftime", return_value="export-20260101-000000"):
+            engine = self.engine()
+            engine.set_archive(archive.Tar)
+            engine.file_exported.connect(engine.cancel, Qt.DirectConnection)
+            engine.run(1, [self.source], self.destination)
+            self.assertEqual(self.outcomes, ["The export was cancelled."])
+            # The partial archive is removed, not the one that was there already.
+            self.assertEqual(os.listdir(self.destination), [os.path.basename(existing)])
+
+            engine = self.engine()
+            engine.set_archive(archive.Tar)
+            engine.run(1, [self.source], self.destination)
+            self.assertEqual(self.outcomes, ["succeeded"])
+
+        with open(existing, "rb") as file:
+            self.assertEqual(file.read(), b"existing")
+        with tarfile.open(os.path.join(self.destination, "export-20260101-000000-1.tar")) as file:
+            self.assertEqual(len(file.getnames()), 3)
+
+    def test_in_flight_bytes(self):
+        # Many more workers than buffers, with files big enough for them to overlap.
+        self.make_files(64, size=16 * CHUNK_SIZE)
+        engine = self.engine(workers=32)
+        engine.set_in_flight_bytes(4 * CHUNK_SIZE)
+        pools = []
+        BufferPool = engine_module._BufferPool
+
+        def pool(*args):
+            pools.append(BufferPool(*args))
+            return pools[-1]
+
+        with mock.patch.object(engine_module, "_BufferPool", pool):
+            engine.run(1, [self.source], self.destination)
+
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertSameTree()
+        self.assertEqual(len(pools), 1)
+        self.assertLessEqual(pools[0].allocated, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
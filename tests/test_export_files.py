@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from export.files import walk
+
+
+class WalkTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._directory.name, "files")
+        for directory in ["b", "a/c", "a/d"]:
+            os.makedirs(os.path.join(self.root, directory))
+        self.names = ["files/2.bin", "files/1.bin", "files/a/1.bin", "files/a/c/1.bin", "files/a/d/1.bin", "files/b/1.bin"]
+        for name in self.names:
+            open(os.path.join(self._directory.name, name), "w").close()
+        # Linked directories aren't followed, linked files are exported.
+        os.symlink("a", os.path.join(self.root, "link"))
+        os.symlink("1.bin", os.path.join(self.root, "3.bin"))
+        self.names.append("files/3.bin")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def names_of(self, files) -> list:
+        return [name.replace(os.sep, "/") for _, name in files]
+
+    def test_sorted(self):
+        self.assertEqual(self.names_of(walk([self.root])), [
+            "files/1.bin", "files/2.bin", "files/3.bin",
+            "files/a/1.bin", "files/a/c/1.bin", "files/a/d/1.bin", "files/b/1.bin",
+        ])
+
+    def test_unsorted(self):
+        self.assertEqual(sorted(self.names_of(walk([self.root], sort=False))), sorted(self.names))
+
+    def test_selected_files(self):
+        files = list(walk([os.path.join(self.root, "a", "1.bin"), os.path.join(self.root, "b")]))
+        self.assertEqual(files, [
+            (os.path.join(self.root, "a", "1.bin"), "1.bin"),
+            (os.path.join(self.root, "b", "1.bin"), os.path.join("b", "1.bin")),
+        ])
+
+    def test_unsorted_is_lazy(self):
+        for index in range(1000):
+            open(os.path.join(self.root, "b", f"{index:04}.bin"), "w").close()
+        read = []
+        scandir = os.scandir
+
+        class Scan:
+            def __init__(self, path):
+                self._scan = scandir(path)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exception):
+                self._scan.close()
+
+            def __iter__(self):
+                for entry in self._scan:
+                    read.append(entry)
+                    yield entry
+
+        with mock.patch("os.scandir", Scan):
+            files = walk([os.path.join(self.root, "b")], sort=False)
+            next(files)
+            self.assertEqual(len(read), 1)
+            files.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
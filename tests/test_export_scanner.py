@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PyQt5.QtCore import *
+
+from export import scanner
+from export.scanner import Scanner
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class ScannerTest(unittest.TestCase):
+    """The scanner runs on the test thread, its signals are delivered directly."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.files = []
+        for index in range(10):
+            path = os.path.join(self._directory.name, f"{index:03}.bin")
+            with open(path, "wb") as file:
+                file.write(bytes(index))
+            self.files.append(path)
+
+        self.scanner = Scanner()
+        self.progress = []
+        self.totals = []
+        self.scanner.progressed.connect(lambda *totals: self.progress.append(totals), Qt.DirectConnection)
+        self.scanner.scanned.connect(lambda *totals: self.totals.append(totals), Qt.DirectConnection)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_files(self):
+        with mock.patch.object(scanner, "REPORT_INTERVAL", 0):
+            self.scanner.scan(self.files)
+        self.assertEqual(self.progress, [(index + 1, sum(range(index + 1))) for index in range(10)])
+        self.assertEqual(self.totals, [(10, sum(range(10)))])
+
+    def test_cancel_files(self):
+        self.scanner.progressed.connect(self.scanner.cancel, Qt.DirectConnection)
+        with mock.patch.object(scanner, "REPORT_INTERVAL", 0):
+            self.scanner.scan(self.files)
+        self.assertEqual(self.progress, [(1, 0)])
+        self.assertEqual(self.totals, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from PyQt5.QtCore import *
+
+from device import Device
+import export
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class ServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self._directory.name, "files")
+        self.destination = os.path.join(self._directory.name, "device")
+        os.makedirs(self.source)
+        os.makedirs(self.destination)
+        for index in range(10):
+            with open(os.path.join(self.source, f"{index:03}.bin"), "wb") as file:
+                file.write(os.urandom(64 * 1024))
+
+        self.device = Device()
+        self.device.check(Device.EmitFoundUnlocked)
+        self.device.set_mount_point(self.destination)
+
+        self.service = export.Service(self.device)
+        self.service.set_files([self.source])
+        self.outcomes = []
+        self.service.succeeded.connect(lambda: self.outcomes.append("succeeded"))
+        self.service.failed.connect(lambda: self.outcomes.append(self.service.failure))
+
+    def tearDown(self):
+        self.service._stop_threads()
+        self._directory.cleanup()
+
+    def wait_for(self, signal, milliseconds: int = 10000) -> None:
+        loop = QEventLoop()
+        signal.connect(loop.quit)
+        QTimer.singleShot(milliseconds, loop.quit)
+        loop.exec()
+        signal.disconnect(loop.quit)
+
+    def test_export(self):
+        self.service.start()
+        self.wait_for(self.service.finished)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.destination, "files"))), sorted(os.listdir(self.source)))
+
+    def test_stale_outcomes_are_ignored(self):
+        self.service.start()
+        # Locking the device cancels the first run.
+        self.device.check(Device.EmitLocked)
+        self.device.check(Device.EmitUnlockingSucceeded)
+        self.assertEqual(self.outcomes, ["The USB device was locked or removed."])
+        self.outcomes.clear()
+
+        self.service.start()
+        # Whatever the first run reports, whenever it does, is about the first run.
+        self.service._engine.failed.emit(1, "The export was cancelled.")
+        self.service._engine.succeeded.emit(1)
+        self.service._engine.progressed.emit(1, 1, 1)
+        self.assertEqual(self.outcomes, [])
+
+        self.wait_for(self.service.finished)
+        self.assertEqual(self.outcomes, ["succeeded"])
+        self.assertIsNone(self.service.failure)
+
+    def test_stale_plans_are_ignored(self):
+        plans = []
+        failures = []
+        self.service.planned.connect(lambda *plan: plans.append(plan))
+        self.service.planning_failed.connect(failures.append)
+
+        self.service.plan()
+        self.service.plan()
+        self.service._engine.planning_failed.emit(1, "stale")
+        self.wait_for(self.service.planned)
+        # Let the engine report anything else it would.
+        loop = QEventLoop()
+        QTimer.singleShot(200, loop.quit)
+        loop.exec()
+
+        self.assertEqual(plans, [(10, 10 * 64 * 1024, 10, 10 * 64 * 1024)])
+        self.assertEqual(failures, [])
+        # Planning failures aren't export failures.
+        self.assertEqual(self.outcomes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from PyQt5.QtCore import *
+
+from device import Device, Monitor
+from device.monitor import MOUNTS_PARENT_DIRECTORY, default_mounts_directory
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+DEVICE_ID = "usb-Vendor_Model_0123-0:0"
+OTHER_DEVICE_ID = "usb-Other_Model_4567-0:0"
+
+
+class MonitorTest(unittest.TestCase):
+    """Against a fake tree: sdb holds an encrypted partition (sdb1, mapped to dm-0), sdc is another USB device."""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        root = self._directory.name
+        self.dev = os.path.join(root, "dev")
+        self.devices = os.path.join(self.dev, "disk", "by-id")
+        self.media = os.path.join(root, "media")
+        self.block = os.path.join(root, "sys", "class", "block")
+        self.mounts = os.path.join(root, "mounts")
+
+        os.makedirs(self.devices)
+        os.makedirs(os.path.join(self.dev, "mapper"))
+        for node in ["sdb", "sdb1", "sdc", "dm-0"]:
+            open(os.path.join(self.dev, node), "w").close()
+        os.symlink("../dm-0", os.path.join(self.dev, "mapper", "secure-usb"))
+        os.makedirs(os.path.join(self.block, "sdb", "sdb1"))
+        os.makedirs(os.path.join(self.block, "sdb1", "holders", "dm-0"))
+        os.makedirs(os.path.join(self.block, "dm-0"))
+        os.makedirs(os.path.join(self.block, "sdc"))
+        os.makedirs(os.path.join(self.media, "Secure"))
+        os.makedirs(os.path.join(self.media, "Other Drive"))
+        self.write_mounts()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def plug(self, id: str, node: str) -> None:
+        os.symlink(f"../../{node}", os.path.join(self.devices, id))
+
+    def write_mounts(self, *lines: str) -> None:
+        with open(self.mounts, "w") as file:
+            file.write("proc /proc proc rw,nosuid 0 0\n")
+            file.write("tmpfs /run tmpfs rw 0 0\n")
+            for line in lines:
+                file.write(line + "\n")
+
+    def monitor(self, device_id=DEVICE_ID):
+        device = Device()
+        monitor = Monitor(device, self.devices, self.media, device_id=device_id, mounts_file=self.mounts, block_directory=self.block)
+        monitor.start()
+        return device, monitor
+
+    def test_missing(self):
+        self.plug(OTHER_DEVICE_ID, "sdc")
+        device, _ = self.monitor()
+        self.assertEqual(device.state, Device.MissingState)
+        self.assertIsNone(device.mount_point)
+
+    def test_mounted_through_a_holder(self):
+        self.plug(DEVICE_ID, "sdb")
+        self.write_mounts(f"{self.dev}/mapper/secure-usb {self.media}/Secure ext4 rw 0 0")
+        device, _ = self.monitor()
+        self.assertEqual(device.state, Device.UnlockedState)
+        self.assertEqual(device.mount_point, os.path.join(self.media, "Secure"))
+
+    def test_mounted_partition(self):
+        self.plug(DEVICE_ID, "sdb")
+        self.write_mounts(f"{self.dev}/sdb1 {self.media}/Secure vfat rw 0 0")
+        device, _ = self.monitor()
+        self.assertEqual(device.mount_point, os.path.join(self.media, "Secure"))
+
+    def test_other_device_mounted(self):
+        # Only the mount points of the device itself count, not whatever else is in the mounts directory.
+        self.plug(DEVICE_ID, "sdb")
+        self.plug(OTHER_DEVICE_ID, "sdc")
+        self.write_mounts(f"{self.dev}/sdc {self.media}/Other\\040Drive vfat rw 0 0")
+        device, _ = self.monitor()
+        self.assertEqual(device.state, Device.LockedState)
+        self.assertIsNone(device.mount_point)
+
+        device, _ = self.monitor(OTHER_DEVICE_ID)
+        self.assertEqual(device.state, Device.UnlockedState)
+        self.assertEqual(device.mount_point, os.path.join(self.media, "Other Drive"))
+
+    def test_any_usb_device(self):
+        self.plug(DEVICE_ID, "sdb")
+        self.write_mounts(f"{self.dev}/mapper/secure-usb {self.media}/Secure ext4 rw 0 0")
+        device, _ = self.monitor(device_id=None)
+        self.assertEqual(device.mount_point, os.path.join(self.media, "Secure"))
+
+    def test_changes(self):
+        self.plug(DEVICE_ID, "sdb")
+        device, monitor = self.monitor()
+        states = []
+        device.state_changed.connect(states.append)
+
+        self.write_mounts(f"{self.dev}/mapper/secure-usb {self.media}/Secure ext4 rw 0 0")
+        monitor._on_directory_changed(self.media)
+        self.write_mounts()
+        monitor._on_directory_changed(self.media)
+        os.remove(os.path.join(self.devices, DEVICE_ID))
+        monitor._on_directory_changed(self.devices)
+
+        self.assertEqual(states, [Device.UnlockedState, Device.LockedState, Device.RemovedState])
+        self.assertIsNone(device.mount_point)
+
+
+class MountsDirectoryTest(unittest.TestCase):
+
+    def test_unknown_user(self):
+        # getpass.getuser() raises KeyError when the user isn't in /etc/passwd (OSError since Python 3.13).
+        for error in [KeyError("getpwuid(): uid not found"), OSError("No username set in the environment")]:
+            with self.subTest(error=error), mock.patch("getpass.getuser", side_effect=error):
+                self.assertEqual(default_mounts_directory(), MOUNTS_PARENT_DIRECTORY)
+
+    def test_import_without_user(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import getpass\ndef getuser(): raise KeyError('getpwuid(): uid not found')\ngetpass.getuser = getuser\nimport device, core, cli"
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+from buttons import PushButton
+from buttons.push_button import MARGINS
+
+app = QApplication.instance() or QApplication([])
+
+
+class ShadowTest(unittest.TestCase):
+
+    def render(self, elevation: PushButton.Elevation) -> QImage:
+        # A window would have its background painted, whatever the flags.
+        parent = QWidget()
+        button = PushButton(PushButton.TypeContained, parent)
+        button.setText("BUTTON")
+        button.resize(button.sizeHint())
+        # The state tracker sets the elevation as the button gets polished.
+        button.ensurePolished()
+        app.processEvents()
+        button.setElevation(elevation)
+        image = QImage(button.size(), QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        # Without the window background, only the button and its shadow are painted.
+        button.render(image, QPoint(), QRegion(), QWidget.DrawChildren)
+        parent.deleteLater()
+        return image
+
+    def alphas(self, image: QImage, points) -> list:
+        return [qAlpha(image.pixel(x, y)) for x, y in points]
+
+    def test_edges_stay_transparent(self):
+        # A shadow clipped by the edges of the widget would end in a hard line.
+        for elevation in [PushButton.ElevationLow, PushButton.ElevationMedium, PushButton.ElevationHigh]:
+            with self.subTest(elevation=elevation):
+                image = self.render(elevation)
+                width, height = image.width(), image.height()
+                edges = [(x, y) for x in [0, width - 1] for y in range(height)] + [(x, y) for y in [0, height - 1] for x in range(width)]
+                self.assertEqual(set(self.alphas(image, edges)), {0})
+
+    def test_shadow_is_painted(self):
+        for elevation in [PushButton.ElevationLow, PushButton.ElevationMedium, PushButton.ElevationHigh]:
+            with self.subTest(elevation=elevation):
+                image = self.render(elevation)
+                below = image.height() - MARGINS.bottom() + 1
+                self.assertGreater(max(self.alphas(image, [(image.width() // 2, below)])), 0)
+
+    def test_no_shadow(self):
+        image = self.render(PushButton.ElevationNone)
+        below = image.height() - MARGINS.bottom() + 1
+        self.assertEqual(self.alphas(image, [(image.width() // 2, below)]), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+
+from PyQt5.QtCore import *
+
+from device import Device, Unlocker
+import tracing
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+STAND_IN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "device", "unlock_stand_in.py")
+# Long enough for any test to be over before the command.
+SLOW_IN_SECONDS = 30
+
+
+class UnlockerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = Device()
+        self.states = []
+        self.device.state_changed.connect(self.states.append)
+        self.device.check(Device.EmitFoundLocked)
+
+    def unlocker(self, seconds: float = 0.1) -> Unlocker:
+        unlocker = Unlocker(self.device, [sys.executable, STAND_IN, "--passphrase", "secret", "--seconds", str(seconds)])
+        self.addCleanup(unlocker.cancel)
+        return unlocker
+
+    def wait_for(self, state: Device.State, milliseconds: int = 10000) -> None:
+        loop = QEventLoop()
+        self.device.state_changed.connect(lambda new_state: new_state == state and loop.quit())
+        QTimer.singleShot(milliseconds, loop.quit)
+        loop.exec()
+
+    def wait(self, milliseconds: int) -> None:
+        loop = QEventLoop()
+        QTimer.singleShot(milliseconds, loop.quit)
+        loop.exec()
+
+    def test_success(self):
+        unlocker = self.unlocker()
+        tracing.start()
+        try:
+            self.device.attempt_unlocking("secret")
+            self.wait_for(Device.UnlockedState)
+        finally:
+            events = tracing.stop()
+
+        self.assertEqual(self.states, [Device.LockedState, Device.UnlockingState, Device.UnlockedState])
+        self.assertIsNone(unlocker.failure)
+        self.assertFalse(unlocker.is_running())
+        # Traced like any other input of the device, the passphrase isn't.
+        signals = [event for event in events if event.get("cat") == "signal"]
+        self.assertIn("unlocking_succeeded", [event["name"] for event in signals])
+        self.assertNotIn("secret", repr(events))
+
+    def test_wrong_passphrase(self):
+        unlocker = self.unlocker()
+        tracing.start()
+        try:
+            self.device.attempt_unlocking("wrong")
+            self.wait_for(Device.LockedState)
+        finally:
+            events = tracing.stop()
+
+        self.assertEqual(self.states, [Device.LockedState, Device.UnlockingState, Device.LockedState])
+        self.assertEqual(unlocker.failure, "No key available with this passphrase.")
+        self.assertIn("unlocking_failed", [event["name"] for event in events if event.get("cat") == "signal"])
+
+        # Another attempt can follow.
+        self.device.attempt_unlocking("secret")
+        self.wait_for(Device.UnlockedState)
+        self.assertEqual(self.device.state, Device.UnlockedState)
+        self.assertIsNone(unlocker.failure)
+
+    def test_timeout(self):
+        unlocker = self.unlocker(SLOW_IN_SECONDS)
+        unlocker.set_timeout(200)
+        self.device.attempt_unlocking("secret")
+        self.wait_for(Device.LockedState)
+
+        self.assertEqual(self.states, [Device.LockedState, Device.UnlockingState, Device.LockedState])
+        self.assertEqual(unlocker.failure, "The unlock command timed out.")
+        self.assertFalse(unlocker.is_running())
+
+    def test_removal(self):
+        unlocker = self.unlocker(SLOW_IN_SECONDS)
+        self.device.attempt_unlocking("secret")
+        self.wait(200)
+        self.assertTrue(unlocker.is_running())
+
+        self.device.check(Device.EmitNotFound)
+        self.assertFalse(unlocker.is_running())
+        # The outcome of the killed command is ignored.
+        self.wait(200)
+        self.assertEqual(self.states, [Device.LockedState, Device.UnlockingState, Device.RemovedState])
+        self.assertIsNone(unlocker.failure)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1 @@
+from .tracer import call, emit, enabled, instant, start, stop
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Opt-in tracing of signals, state changes and page transitions.
+#
+# Events are recorded with monotonic timestamps, and durations where
+# it makes sense, in the Chrome trace event format (see stop()).
+# Unless tracing was started, recording costs a function call and a check.
+
+# Recorded events, None unless tracing was started.
+# Appending to a list is atomic, events can be recorded from any thread.
+_events = None
+_start_ns = 0
+_threads = set()
+
+
+def start() -> None:
+    """Start recording, events recorded by a previous start are dropped."""
+    global _events, _start_ns
+    _threads.clear()
+    _start_ns = time.perf_counter_ns()
+    _events = []
+
+
+def stop(path: Optional[str] = None) -> list:
+    """Stop recording, return the events, and save them as a Chrome trace if a path is given.
+
+    The trace can be loaded in chrome://tracing or https://ui.perfetto.dev
+    """
+    global _events
+    events, _events = _events or [], None
+    if path is not None:
+        with open(path, "w") as trace:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace)
+    return events
+
+
+def enabled() -> bool:
+    return _events is not None
+
+
+def call(category: str, name: str, function: Callable, *args) -> Any:
+    """Call a function, and record how long it took if tracing is enabled."""
+    if _events is None:
+        return function(*args)
+    start = time.perf_counter_ns()
+    try:
+        return function(*args)
+    finally:
+        _record({"ph": "X", "cat": category, "name": name, "ts": _microseconds(start), "dur": (time.perf_counter_ns() - start) / 1000})
+
+
+def emit(signal, *args, redacted: bool = False) -> None:
+    """Emit a signal, and record how long its direct connections took if tracing is enabled.
+
+    The values of the arguments are recorded too, unless they're redacted (e.g. passphrases).
+    """
+    if _events is None:
+        signal.emit(*args)
+        return
+    start = time.perf_counter_ns()
+    try:
+        signal.emit(*args)
+    finally:
+        # The signature looks like "2state_changed(QString)".
+        name = signal.signal[1:signal.signal.index("(")]
+        _record({"ph": "X", "cat": "signal", "name": name, "ts": _microseconds(start), "dur": (time.perf_counter_ns() - start) / 1000, "args": {"values": [] if redacted else [repr(arg) for arg in args]}})
+
+
+def instant(category: str, name: str, **args) -> None:
+    """Record that something happened, if tracing is enabled."""
+    if _events is None:
+        return
+    _record({"ph": "i", "s": "t", "cat": category, "name": name, "ts": _microseconds(time.perf_counter_ns()), "args": args})
+
+
+def _microseconds(timestamp_ns: int) -> float:
+    return (timestamp_ns - _start_ns) / 1000
+
+
+def _record(event: dict) -> None:
+    events = _events
+    if events is None:
+        return  # stopped from another thread meanwhile
+    thread = threading.get_ident()
+    event["pid"] = os.getpid()
+    event["tid"] = thread
+    if thread not in _threads:
+        _threads.add(thread)
+        events.append({"ph": "M", "name": "thread_name", "pid": event["pid"], "tid": thread, "args": {"name": threading.current_thread().name}})
+    events.append(event)
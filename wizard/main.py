@@ -1,12 +1,12 @@
 from enum import IntEnum
 
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 from device import Device
 import export
-from .pages import StartPage, InsertDevicePage, UnlockDevicePage, ReviewDataPage, ExportPage
+import tracing
+from .pages import LazyPage, StartPage, InsertDevicePage, UnlockDevicePage, ReviewDataPage, ExportPage
 
 
 class Wizard(QWizard):
@@ -30,17 +30,42 @@ class Wizard(QWizard):
             QWizard.NoBackButtonOnStartPage
         )
 
-        self.setPage(Wizard.PageId.START, StartPage())
-        self.setPage(Wizard.PageId.INSERT_DEVICE, InsertDevicePage(self._device.state_changed))
-        self.setPage(Wizard.PageId.UNLOCK_DEVICE, UnlockDevicePage(self._device))
-        self.setPage(Wizard.PageId.REVIEW_DATA, ReviewDataPage())
-        self.setPage(Wizard.PageId.EXPORT, ExportPage(self._export_service))
+        # Pages are only built when they're first visited (see LazyPage).
+        self.setPage(Wizard.PageId.START, LazyPage(lambda: StartPage(self._export_service)))
+        self.setPage(Wizard.PageId.INSERT_DEVICE, LazyPage(lambda: InsertDevicePage(self._device)))
+        self.setPage(Wizard.PageId.UNLOCK_DEVICE, LazyPage(lambda: UnlockDevicePage(self._device)))
+        self.setPage(Wizard.PageId.REVIEW_DATA, LazyPage(lambda: ReviewDataPage(self._export_service)))
+        self.setPage(Wizard.PageId.EXPORT, LazyPage(lambda: ExportPage(self._export_service)))
 
         self.setStartId(Wizard.PageId.START)
 
+        self.currentIdChanged.connect(lambda id: tracing.instant("page", "current page", id=id))
+
         for page in [self.page(id) for id in self.pageIds()]:
             page.completeChanged.connect(lambda: self._set_focus(QWizard.WizardButton.NextButton))
 
+    def initializePage(self, id: int) -> None:
+        tracing.call("page", f"initialize {Wizard.PageId(id).name}", super().initializePage, id)
+
+    def cleanupPage(self, id: int) -> None:
+        tracing.call("page", f"cleanup {Wizard.PageId(id).name}", super().cleanupPage, id)
+
+    # What people do with the wizard is traced too, so that traces can be replayed
+    # (see simulation.replay). The Next and Back buttons are traced by the pages
+    # they initialize and clean up.
+
+    def setVisible(self, visible: bool) -> None:
+        tracing.call("user", "show" if visible else "hide", super().setVisible, visible)
+
+    def restart(self) -> None:
+        tracing.call("user", "restart", super().restart)
+
+    def accept(self) -> None:
+        tracing.call("user", "finish", super().accept)
+
+    def reject(self) -> None:
+        tracing.call("user", "cancel", super().reject)
+
     @pyqtSlot(int)
     def _set_focus(self, which: QWizard.WizardButton) -> None:
         self.button(which).setFocus(True)
@@ -3,3 +3,4 @@ from .insert_device_page import InsertDevicePage
 from .unlock_device_page import UnlockDevicePage
 from .review_data_page import ReviewDataPage
 from .export_page import ExportPage
+from .lazy_page import LazyPage
@@ -1,10 +1,24 @@
+import collections
+import html
+
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 import export
+from .formatting import format_duration, format_size
 
 class Progress(QWidget):
+    """A progress bar, with the transfer rate and the estimated time left.
+
+    Progress updates can be very frequent, they are only stored as they
+    come and the widget is refreshed on a timer, at most REFRESH_RATE
+    times per second. The bar is indeterminate until the first update.
+    """
+
+    REFRESH_RATE = 10
+    # The transfer rate is averaged over that many seconds.
+    RATE_WINDOW = 5
+
     def __init__(self):
         super().__init__()
 
@@ -13,13 +27,76 @@ class Progress(QWidget):
         bar = QProgressBar()
         bar.setMinimum(0)
         bar.setMaximum(0)
+        totals = QLabel()
+        totals.hide()
+        rate = QLabel()
+        rate.hide()
 
         layout = QVBoxLayout()
         layout.addWidget(bar)
+        layout.addWidget(rate)
+        layout.addWidget(totals)
         layout.addWidget(hint)
         layout.setContentsMargins(0, 0, 0, 0)
         self.setLayout(layout)
 
+        timer = QTimer(self)
+        timer.setInterval(1000 // self.REFRESH_RATE)
+        timer.timeout.connect(self._refresh)
+
+        self._bar = bar
+        self._rate = rate
+        self._totals = totals
+        self._timer = timer
+        self._clock = QElapsedTimer()
+        self._samples = collections.deque()
+        self._progress = None
+
+    def start(self) -> None:
+        self._bar.setMaximum(0)
+        self._rate.hide()
+        self._samples.clear()
+        self._progress = None
+        self._clock.start()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    @pyqtSlot(int, "qint64")
+    def set_totals(self, files: int, size: int) -> None:
+        self._totals.setText(f"{files} files ({format_size(size)}) selected.")
+        self._totals.show()
+
+    @pyqtSlot("qint64", "qint64")
+    def set_progress(self, written: int, total: int) -> None:
+        self._progress = (written, total)
+
+    @pyqtSlot()
+    def _refresh(self) -> None:
+        if self._progress is None:
+            return
+        written, total = self._progress
+        self._progress = None
+
+        # QProgressBar values are 32-bit integers, too small for byte counts.
+        self._bar.setMaximum(1000)
+        self._bar.setValue(1000 * written // total if total else 1000)
+
+        now = self._clock.elapsed() / 1000
+        self._samples.append((now, written))
+        while now - self._samples[0][0] > self.RATE_WINDOW:
+            self._samples.popleft()
+        then, written_then = self._samples[0]
+        if now == then:
+            return
+        rate = (written - written_then) / (now - then)
+        text = f"{format_size(written)} of {format_size(total)} written, {format_size(rate)}/s"
+        if rate > 0:
+            text += f", {format_duration((total - written) / rate)} left"
+        self._rate.setText(text)
+        self._rate.show()
+
 
 class ExportPage(QWizardPage):
 
@@ -38,6 +115,10 @@ class ExportPage(QWizardPage):
 
         progress = Progress()
         progress.hide()
+        self._export_service.scan_progressed.connect(progress.set_totals)
+        self._export_service.scanned.connect(progress.set_totals)
+        if self._export_service.totals is not None:
+            progress.set_totals(*self._export_service.totals)  # scanned before the page was built
 
         layout = QVBoxLayout()
         layout.addWidget(content)
@@ -58,6 +139,7 @@ class ExportPage(QWizardPage):
     @pyqtSlot()
     def _on_export_started(self) -> None:
         self._content.setText("<p>Exporting files...</p>")
+        self._progress.start()
         self._progress.show()
         self._is_complete = False
         self.completeChanged.emit()
@@ -65,6 +147,7 @@ class ExportPage(QWizardPage):
     @pyqtSlot()
     def _on_export_succeeded(self) -> None:
         self._content.setText("The files were exported successfully.")
+        self._progress.stop()
         self._progress.hide()
         self._is_complete = True
         self.completeChanged.emit()
@@ -72,8 +155,12 @@ class ExportPage(QWizardPage):
 
     @pyqtSlot()
     def _on_export_failed(self) -> None:
-        self._content.setText("<p>An error happened and the files were <b>not</b> exported successfully.</p><p>Please be aware that it is possible that some of the data was written to the USB device.</p><p>You can attempt exporting again.</p>")
+        details = ""
+        if self._export_service.failure:
+            details = f"<p><i>{html.escape(self._export_service.failure)}</i></p>"
+        self._content.setText(f"<p>An error happened and the files were <b>not</b> exported successfully.</p>{details}<p>Please be aware that it is possible that some of the data was written to the USB device.</p><p>You can attempt exporting again.</p>")
         self._is_complete = True
+        self._progress.stop()
         self._progress.hide()
         self.completeChanged.emit()
         self._disconnect_export_service()
@@ -82,6 +169,7 @@ class ExportPage(QWizardPage):
         self._export_service.succeeded.connect(self._on_export_succeeded)
         self._export_service.failed.connect(self._on_export_failed)
         self._export_service.started.connect(self._on_export_started)
+        self._export_service.progressed.connect(self._progress.set_progress)
 
     def _disconnect_export_service(self) -> None:
         # This is a it of a hack. By the time we do this, we'd be better off
@@ -89,3 +177,4 @@ class ExportPage(QWizardPage):
         self._export_service.succeeded.disconnect(self._on_export_succeeded)
         self._export_service.failed.disconnect(self._on_export_failed)
         self._export_service.started.disconnect(self._on_export_started)
+        self._export_service.progressed.disconnect(self._progress.set_progress)
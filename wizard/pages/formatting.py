@@ -0,0 +1,20 @@
+def format_size(size: int) -> str:
+    """Format a number of bytes for humans, e.g. 1.5 MB."""
+    for unit in ["bytes", "KB", "MB", "GB"]:
+        if size < 1000:
+            break
+        size /= 1000
+    else:
+        unit = "TB"
+    return f"{size:.0f} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration for humans, roughly, e.g. about 3 minutes."""
+    if seconds < 60:
+        return "less than a minute"
+    if seconds < 3600:
+        minutes = round(seconds / 60)
+        return f"about {minutes} minute{'s' if minutes > 1 else ''}"
+    hours = seconds / 3600
+    return f"about {hours:.1f} hours"
@@ -0,0 +1,53 @@
+from typing import Callable, Optional
+
+from PyQt5.QtWidgets import *
+
+
+class LazyPage(QWizardPage):
+    """Stands in for a wizard page until it's first visited.
+
+    The actual page is only constructed when the wizard initializes it,
+    so that the wizard can be created (and shown) without building
+    pages that may never be visited. The actual page is then embedded,
+    and the wizard API is forwarded to it: title, completeness,
+    initialization, validation and cleanup.
+
+    The actual page doesn't belong to the wizard, its wizard() is None.
+    """
+
+    def __init__(self, factory: Callable[[], QWizardPage], parent=None):
+        super().__init__(parent)
+        self._factory = factory
+        self._page = None
+
+    def page(self) -> Optional[QWizardPage]:
+        """The actual page, if it was built already."""
+        return self._page
+
+    def initializePage(self) -> None:
+        if self._page is None:
+            self._build()
+        self._page.initializePage()
+
+    def cleanupPage(self) -> None:
+        if self._page is not None:
+            self._page.cleanupPage()
+
+    def isComplete(self) -> bool:
+        return self._page is not None and self._page.isComplete()
+
+    def validatePage(self) -> bool:
+        return self._page is None or self._page.validatePage()
+
+    def _build(self) -> None:
+        page = self._factory()
+        self.setTitle(page.title())
+        self.setSubTitle(page.subTitle())
+        page.completeChanged.connect(self.completeChanged)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(page)
+        self.setLayout(layout)
+
+        self._page = page
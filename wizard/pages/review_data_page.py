@@ -1,18 +1,193 @@
+import collections
+import itertools
+import os
+from typing import Any, List
+
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import export
+import export.archive
+from export.files import walk
+from .formatting import format_size
+
+
+class FileListModel(QAbstractTableModel):
+    """The files selected for export, listed lazily.
+
+    Rows are fetched in batches as the view scrolls (see canFetchMore),
+    and files are only stat'ed when their size is displayed,
+    so that large selections don't need to be walked upfront.
+    Files are listed in the order of the file system, not sorted.
+    """
+
+    BATCH_SIZE = 256
+    # How many file sizes are remembered, a few screens worth.
+    SIZE_CACHE_SIZE = 1024
+
+    NameColumn, SizeColumn, TypeColumn = range(3)
+    _headers = ["Name", "Size", "Type"]
 
-class ReviewDataPage(QWizardPage):
-    
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._rows = []
+        self._files = iter(())
+        self._exhausted = True
+        self._sizes = collections.OrderedDict()
+
+    def set_files(self, paths: List[str]) -> None:
+        self.beginResetModel()
+        self._rows = []
+        # Sorting would read whole directories before the first rows can be shown.
+        self._files = walk(paths, sort=False)
+        self._exhausted = False
+        self._sizes.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self._headers[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        source, name = self._rows[index.row()]
+        if index.column() == self.NameColumn:
+            return name
+        if index.column() == self.SizeColumn:
+            return self._size(source)
+        import mimetypes  # only needed once the list is shown, it's slow to import
+        return mimetypes.guess_type(name)[0] or "Unknown"
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if parent.isValid():
+            return
+        try:
+            batch = list(itertools.islice(self._files, self.BATCH_SIZE))
+        except OSError:
+            batch = []
+        if len(batch) < self.BATCH_SIZE:
+            self._exhausted = True
+        if not batch:
+            return
+        self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(batch) - 1)
+        self._rows.extend(batch)
+        self.endInsertRows()
+
+    def _size(self, source: str) -> str:
+        size = self._sizes.get(source)
+        if size is None:
+            try:
+                size = format_size(os.stat(source).st_size)
+            except OSError:
+                size = ""
+            self._sizes[source] = size
+            if len(self._sizes) > self.SIZE_CACHE_SIZE:
+                self._sizes.popitem(last=False)
+        else:
+            self._sizes.move_to_end(source)
+        return size
+
+
+class ReviewDataPage(QWizardPage):
+
+    # How the files can be written to the device.
+    _formats = [("Separate files", None), ("A .tar archive", export.archive.Tar), ("A compressed .tar.gz archive", export.archive.CompressedTar)]
+    def __init__(self, export_service: export.Service, parent=None):
+        super().__init__(parent)
+
+        self._export_service = export_service
 
         self.setTitle("Review file list")
 
-        content = QLabel("The following files will be exported: ...")
+        content = QLabel("The following files will be exported:")
         content.setWordWrap(True)
 
+        totals = QLabel()
+        totals.setWordWrap(True)
+
+        files = FileListModel(self)
+        view = QTreeView()
+        view.setModel(files)
+        # Both matter for performance with many rows.
+        view.setRootIsDecorated(False)
+        view.setUniformRowHeights(True)
+
+        summary = QLabel()
+        summary.setWordWrap(True)
+        summary.hide()
+
+        format = QComboBox()
+        for text, value in self._formats:
+            format.addItem(text, value)
+        format.setCurrentIndex(next(index for index, (_, value) in enumerate(self._formats) if value == export_service.archive_format))
+        format.currentIndexChanged.connect(self._on_format_changed)
+
+        format_layout = QFormLayout()
+        format_layout.addRow("Export as:", format)
+
         layout = QVBoxLayout()
         layout.addWidget(content)
+        layout.addWidget(view)
+        layout.addWidget(totals)
+        layout.addWidget(summary)
+        layout.addLayout(format_layout)
         self.setLayout(layout)
+
+        self._export_service.planned.connect(self._on_export_planned)
+        self._export_service.planning_failed.connect(self._on_export_planning_failed)
+        self._export_service.scan_progressed.connect(self._on_scan_progressed)
+        self._export_service.scanned.connect(self._on_scanned)
+
+        self._files = files
+        self._totals = totals
+        self._summary = summary
+        self._format = format
+
+        # The page is only built when it's first visited, the scan may be over.
+        if self._export_service.totals is not None:
+            self._on_scanned(*self._export_service.totals)
+
+    def initializePage(self) -> None:
+        super().initializePage()
+        self._files.set_files(self._export_service.files)
+        self._summary.hide()
+        self._export_service.plan()
+
+    @pyqtSlot(int)
+    def _on_format_changed(self, index: int) -> None:
+        self._export_service.set_archive(self._format.itemData(index))
+        # Archives are always written in full, what the export would transfer changed.
+        self._summary.hide()
+        self._export_service.plan()
+
+    @pyqtSlot(int, "qint64", int, "qint64")
+    def _on_export_planned(self, files: int, size: int, total_files: int, total_size: int) -> None:
+        text = f"<p>{files} files ({format_size(size)}) will be written to the USB device.</p>"
+        if files < total_files:
+            text += f"<p>The other {total_files - files} files ({format_size(total_size - size)}) are already on the USB device.</p>"
+        self._summary.setText(text)
+        self._summary.show()
+
+    @pyqtSlot(str)
+    def _on_export_planning_failed(self, reason: str) -> None:
+        self._summary.setText(f"<p>Couldn't find out what will be written to the USB device: {reason}</p>")
+        self._summary.show()
+
+    @pyqtSlot(int, "qint64")
+    def _on_scan_progressed(self, files: int, size: int) -> None:
+        self._totals.setText(f"Counting the selected files: {files} files ({format_size(size)}) so far...")
+
+    @pyqtSlot(int, "qint64")
+    def _on_scanned(self, files: int, size: int) -> None:
+        self._totals.setText(f"{files} files ({format_size(size)}) are selected.")
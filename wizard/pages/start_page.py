@@ -1,13 +1,15 @@
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+import export
+
 
 class StartPage(QWizardPage):
     
-    def __init__(self, parent=None):
+    def __init__(self, export_service: export.Service, parent=None):
         super().__init__(parent)
 
+        self._export_service = export_service
+
         self.setTitle("Disclaimer")
 
         content = QLabel("Please be aware that exporting files carries some <b>risks</b>.")
@@ -16,3 +18,8 @@ class StartPage(QWizardPage):
         layout = QVBoxLayout()
         layout.addWidget(content)
         self.setLayout(layout)
+
+    def initializePage(self) -> None:
+        super().initializePage()
+        # The sooner the better, the totals are needed on later pages.
+        self._export_service.scan()
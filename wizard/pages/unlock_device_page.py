@@ -1,5 +1,4 @@
 from PyQt5.QtCore import *
-from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 from device import Device
@@ -81,6 +80,9 @@ class UnlockDevicePage(QWizardPage):
         self.unlocking_message = unlocking_message
         self.failure_message = failure_message
 
+        # The page may be built after the device was found, or even unlocked.
+        self._on_device_state_changed()
+
     def isComplete(self) -> bool:
         return self._device.state == Device.UnlockedState
 